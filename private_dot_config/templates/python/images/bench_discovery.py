@@ -0,0 +1,119 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "numpy",
+#     "pillow",
+#     "tqdm",
+# ]
+# ///
+"""
+在合成的目录树上对比 images_to_video.py / resize_images.py 的文件发现耗时:
+- walk:          os.walk + 逐文件正则 + 每次构建排序键时重新 re.split (旧实现)。
+- scandir:       discover_files 顺序扫描 (workers=1)。
+- scandir 并行:  discover_files 并行扫描子目录。
+合成文件均为空文件，只测试目录遍历、筛选与排序，不涉及图片解码。
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# discover_files 与本脚本位于同一目录
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from images_to_video import discover_files  # noqa: E402
+
+
+def legacy_natural_sort_key(s):
+    """旧实现的排序键: 每次调用都通过 re.split 解析模式字符串。"""
+    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+
+
+def legacy_discover(input_dir, regex_pattern=None):
+    """旧路径: os.walk 遍历，逐文件正则筛选，最后按文件名自然排序。"""
+    files = []
+    compiled_regex = re.compile(regex_pattern) if regex_pattern else None
+    for root, _, filenames in os.walk(input_dir):
+        for filename in filenames:
+            if compiled_regex and not compiled_regex.search(filename):
+                continue
+            files.append(os.path.join(root, filename))
+    files.sort(key=lambda f: legacy_natural_sort_key(os.path.basename(f)))
+    return files
+
+
+def build_tree(root, dirs, files_per_dir, depth):
+    """
+    生成合成目录树: dirs 个叶子目录 (嵌套 depth 层)，每个目录 files_per_dir 个空 .png 文件，
+    外加同等数量的 .txt 干扰文件用于测试正则筛选。文件名全局唯一，保证排序结果确定。
+    """
+    index = 0
+    for d in range(dirs):
+        parts = [f"level{level}_{d % (level + 2)}" for level in range(depth - 1)] + [f"shot_{d}"]
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+        for _ in range(files_per_dir):
+            open(os.path.join(directory, f"frame_{index}.png"), 'w').close()
+            open(os.path.join(directory, f"frame_{index}.txt"), 'w').close()
+            index += 1
+    return index
+
+
+def time_best(func, repeat):
+    """重复执行 repeat 次，返回 (最短耗时, 最后一次的结果)。"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="在合成目录树上对比 os.walk 与 os.scandir 两种文件发现路径的耗时。",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("--dirs", type=int, default=200, help="叶子目录数量 (默认: 200)。")
+    parser.add_argument("--files-per-dir", type=int, default=500, help="每个目录中的 .png 文件数 (默认: 500)。")
+    parser.add_argument("--depth", type=int, default=3, help="目录嵌套深度 (默认: 3)。")
+    parser.add_argument("--workers", type=int, default=8, help="并行扫描的线程数 (默认: 8)。")
+    parser.add_argument("--repeat", type=int, default=3, help="每种路径重复次数，取最小值 (默认: 3)。")
+    parser.add_argument("--root", type=str, default=None, help="""
+【可选】在指定目录下生成合成树 (例如 NFS 挂载点)，默认使用系统临时目录。""")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_discovery_", dir=args.root)
+    try:
+        print("📂 正在生成合成目录树...")
+        total = build_tree(root, args.dirs, args.files_per_dir, args.depth)
+        print(f"🎞️ 目录树: {args.dirs} 个目录, {total} 个 .png + {total} 个 .txt 文件\n")
+
+        regex_pattern = r'\.png$'
+        legacy_time, legacy_files = time_best(lambda: legacy_discover(root, regex_pattern), args.repeat)
+        scandir_time, scandir_files = time_best(
+            lambda: discover_files(root, regex_pattern, recursive=True, workers=1), args.repeat
+        )
+        parallel_time, parallel_files = time_best(
+            lambda: discover_files(root, regex_pattern, recursive=True, workers=args.workers), args.repeat
+        )
+
+        if not (legacy_files == scandir_files == parallel_files):
+            print("🔴 错误: 三种路径得到的文件列表不一致！")
+            return
+
+        print(f"{'路径':<16} {'耗时 (s)':>10} {'加速比':>8}")
+        print(f"{'walk':<16} {legacy_time:>10.3f} {1:>7.2f}x")
+        print(f"{'scandir':<16} {scandir_time:>10.3f} {legacy_time / scandir_time:>7.2f}x")
+        print(f"{'scandir 并行':<14} {parallel_time:>10.3f} {legacy_time / parallel_time:>7.2f}x")
+        print(f"\n✅ 三种路径得到的 {len(legacy_files)} 个文件及其顺序完全一致。")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "numpy",
+#     "pillow",
+#     "tqdm",
+# ]
+# ///
+"""
+对比 resize_images.py 中两种缩小路径的耗时与画质:
+- 全尺寸: 完整解码后直接 LANCZOS 缩放 (旧实现，--reducing-gap 0)。
+- 快速:   JPEG 使用 draft() 在 DCT 域缩小解码，其他格式使用 reduce，再以 LANCZOS 完成 (当前实现)。
+画质以快速路径相对全尺寸路径输出的 PSNR 衡量。默认在合成的 24MP JPEG/PNG 上测试，也可指定真实图片。
+"""
+import io
+import os
+import sys
+import time
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    print("错误: 未找到 'numpy' 库。")
+    print("请通过命令 'pip install numpy' 来安装它。")
+    exit()
+
+from PIL import Image
+
+# scale_image 与本脚本位于同一目录
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from resize_images import DEFAULT_REDUCING_GAP, scale_image  # noqa: E402
+
+# PSNR 低于该值时提示画质差异可见
+PSNR_WARNING_DB = 35.0
+
+
+def synthetic_image(width, height, seed=0):
+    """生成带渐变、几何边缘与细节纹理的 RGB 图片，近似真实照片的频谱分布。"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    r = 128 + 100 * np.sin(x / 173.0) * np.cos(y / 211.0)
+    g = 128 + 90 * np.sin((x + y) / 97.0)
+    b = 255 * x / width
+    rgb = np.stack([r, g, b], axis=-1)
+    # 几何边缘: 若干高对比度的矩形
+    for _ in range(40):
+        x0, y0 = rng.integers(0, width - 200), rng.integers(0, height - 200)
+        w, h = rng.integers(20, 200, size=2)
+        rgb[y0:y0 + h, x0:x0 + w] = rng.integers(0, 256, size=3)
+    # 细节纹理: 高频噪声
+    rgb += rng.normal(0, 12, size=rgb.shape).astype(np.float32)
+    return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8))
+
+
+def encode(img, fmt):
+    """把图片编码为内存中的文件，避免测试受磁盘缓存影响。"""
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **({"quality": 92} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def resize_from_bytes(data, scale, reducing_gap):
+    """打开内存中的图片并缩放，返回 (耗时, 结果)。"""
+    start = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as img:
+        new_size = (round(img.width * scale), round(img.height * scale))
+        result = scale_image(img, new_size, reducing_gap)
+        result.load()
+    return time.perf_counter() - start, result
+
+
+def psnr(a, b):
+    """两张同尺寸图片之间的 PSNR (dB)。"""
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    mse = np.mean(diff ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="对比全尺寸解码与 draft/reduce 快速解码两种缩小路径的耗时与画质 (PSNR)。",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("images", nargs="*", help="【可选】用于测试的真实图片；不指定时生成 24MP 的合成 JPEG 与 PNG。")
+    parser.add_argument("--scales", type=str, default="0.5,0.25,0.125", help="以逗号分隔的一组缩放比例 (默认: '0.5,0.25,0.125')。")
+    parser.add_argument("--reducing-gap", type=float, default=DEFAULT_REDUCING_GAP, help=f"快速路径使用的系数 (默认: {DEFAULT_REDUCING_GAP})。")
+    parser.add_argument("--repeat", type=int, default=3, help="每种配置重复次数，取最小值 (默认: 3)。")
+    args = parser.parse_args()
+
+    samples = []
+    if args.images:
+        for path in args.images:
+            with open(path, 'rb') as f:
+                samples.append((os.path.basename(path), f.read()))
+    else:
+        print("📂 正在生成 6000x4000 的合成图片...")
+        img = synthetic_image(6000, 4000)
+        samples = [("synthetic.jpg", encode(img, "JPEG")), ("synthetic.png", encode(img, "PNG"))]
+
+    print(f"{'图片':<18} {'比例':>6} {'全尺寸 (s)':>11} {'快速 (s)':>9} {'加速比':>7} {'PSNR (dB)':>10}")
+    for name, data in samples:
+        for scale in (float(v) for v in args.scales.split(",")):
+            full_time = min(resize_from_bytes(data, scale, 0)[0] for _ in range(args.repeat))
+            fast_time = min(resize_from_bytes(data, scale, args.reducing_gap)[0] for _ in range(args.repeat))
+            quality = psnr(resize_from_bytes(data, scale, 0)[1], resize_from_bytes(data, scale, args.reducing_gap)[1])
+            flag = "  🟡" if quality < PSNR_WARNING_DB else ""
+            print(f"{name:<18} {scale:>6g} {full_time:>11.3f} {fast_time:>9.3f} {full_time / fast_time:>6.2f}x {quality:>10.2f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
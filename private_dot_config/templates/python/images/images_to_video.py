@@ -1,6 +1,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "numpy",
 #     "opencv-python-headless",
 #     "pillow",
 #     "tqdm",
@@ -8,11 +9,18 @@
 # ///
 import os
 import re
+import json
+import hashlib
 import argparse
 import time
 import subprocess
 import shutil
 import tempfile
+import threading
+import itertools
+from collections import Counter, deque
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # 尝试导入所需库，如果失败则提供安装指导
 try:
@@ -29,10 +37,1022 @@ except ImportError:
     print("请通过命令 'pip install tqdm' 来安装它，以启用进度条功能。")
     exit()
 
+try:
+    import numpy as np
+except ImportError:
+    print("错误: 未找到 'numpy' 库。")
+    print("它用于读取内存帧与 .npy 帧数组，请通过命令 'pip install numpy' 来安装它。")
+    exit()
+
+
+# --- 并行读图的默认参数 ---
+# cv2.imread / cv2.resize 在解码期间会释放 GIL，因此线程池即可让多张图片真正并行解码。
+DEFAULT_READ_WORKERS = min(8, os.cpu_count() or 1)
+
+# --- 帧格式归一化 ---
+# 所有输入 (16 位、带 alpha、灰度) 统一转换为 3 通道；8 位输出为 uint8，10 位输出先转换为 uint16 (bgr48le)
+# 交给 ffmpeg，再由 ffmpeg 编码为 yuv420p10le。
+BIT_DEPTH_PIX_FMTS = {
+    8: {"dtype": "uint8", "bgr": "bgr24", "rgb": "rgb24", "output": "yuv420p"},
+    10: {"dtype": "uint16", "bgr": "bgr48le", "rgb": "rgb48le", "output": "yuv420p10le"},
+}
+# alpha 合成的默认背景色 (8 位 B,G,R)
+DEFAULT_BACKGROUND = (0, 0, 0)
+# EXIF 方向标签。IMREAD_UNCHANGED 不会按它旋转图片，因此在探测阶段读取、在读图线程中自行旋转/翻转
+EXIF_ORIENTATION_TAG = 0x0112
+# 宽高互换的方向值 (含 90°/270° 旋转)
+EXIF_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+# --- 性能剖析 (--profile) ---
+# 各阶段的中文名称，同时决定报告中的显示顺序
+PROFILE_STAGE_LABELS = {
+    "scan": "扫描目录",
+    "sort": "自然排序",
+    "probe": "探测图片头",
+    "imread": "解码图片",
+    "resize": "缩放",
+    "normalize": "格式归一化",
+    "write": "写入编码器",
+    "finish": "等待编码收尾",
+    "ffmpeg": "FFmpeg 读图+编码",
+    "concat": "拼接分段",
+}
+PROFILE_REPORT_SUFFIX = ".profile.json"
+
+# --- 图片头探测 ---
+# 探测只读取文件头 (PIL 惰性打开，不解码像素)，以 I/O 为主，因此可以使用比解码更多的线程。
+DEFAULT_PROBE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# 报告尺寸不符时最多列出的示例文件数
+MISMATCH_REPORT_LIMIT = 5
+
+# --- FFmpeg 编码器映射 ---
+FFMPEG_CODEC_MAP = {
+    'h264': 'libx264',
+    'h265': 'libx265',
+    'av1': 'libaom-av1', # 需要 ffmpeg 编译时支持 libaom
+}
+
+# --- OpenCV FourCC 映射 ---
+OPENCV_FOURCC_MAP = {
+    'h264': 'avc1', # H.264
+    'h265': 'hvc1', # H.265
+    'av1': 'av01',  # AV1
+}
+
+# --- 分段并行编码 ---
+# 未指定 --gop 时分段所用的关键帧间隔 (与 x264/x265 的默认 keyint 一致)。
+# 每段长度取该值的整数倍，各段内的关键帧节奏与整段编码时相同。
+DEFAULT_CHUNK_GOP = 250
+
+# --- 分段编码缓存 (--cache-dir) ---
+# 启用缓存时分段长度固定为 GOP 的整数倍 (与总帧数无关)，在序列末尾追加帧不会改变已有分段的边界。
+CACHE_SEGMENT_GOPS = 1
+# 缓存键的格式版本，键的组成方式或解码结果 (如 EXIF 方向处理) 改变时递增，使旧缓存自然失效
+CACHE_KEY_VERSION = 2
+
+# --- 内存帧来源 ---
+# video_to_images.py 的 npy 输出模式按 RGB 顺序保存帧，因此 .npy 文件默认按 RGB 解释；
+# 其余来源 (数组、列表、生成器) 默认与 OpenCV 一致，按 BGR 解释。
+NPY_DEFAULT_CHANNEL_ORDER = 'rgb'
+
+# --- 编码器调优 ---
+# x264/x265 的预设名称；libaom-av1 没有预设，按速度映射为 -cpu-used (0 最慢最好，8 最快)。
+ENCODER_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+AV1_CPU_USED_MAP = {
+    "ultrafast": 8,
+    "superfast": 8,
+    "veryfast": 7,
+    "faster": 6,
+    "fast": 5,
+    "medium": 4,
+    "slow": 3,
+    "slower": 2,
+    "veryslow": 1,
+}
+# 命名的速度/质量档位；CRF 的取值范围因编码器而异，因此按编码器分别给出。
+# 命令行中显式指定的 --preset / --crf 等参数优先于档位中的值。
+ENCODE_PROFILES = {
+    "fast": {"preset": "veryfast", "crf": {"h264": 26, "h265": 30, "av1": 38}},
+    "balanced": {"preset": "medium", "crf": {"h264": 23, "h265": 28, "av1": 32}},
+    "quality": {"preset": "slow", "crf": {"h264": 18, "h265": 22, "av1": 24}},
+}
+
+
+# --- 文件发现 ---
+# 自然排序的分段正则，预编译一次，避免为每个文件名重新解析。
+NATURAL_SORT_PATTERN = re.compile(r'([0-9]+)')
+# 并行扫描子目录的默认线程数 (对 NFS 等高延迟文件系统效果明显)
+DEFAULT_SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
 
 def natural_sort_key(s):
     """为字符串提供自然排序的键，例如 'img10.jpg' 会在 'img2.jpg' 之后。"""
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+    return [int(text) if text.isdigit() else text.lower() for text in NATURAL_SORT_PATTERN.split(s)]
+
+
+def scan_directory(directory, compiled_regex=None, recursive=False):
+    """
+    使用 os.scandir 扫描单个目录，直接复用 DirEntry 缓存的类型信息，不再逐个调用 os.path.isfile。
+    返回 (文件列表, 子目录列表)，文件列表中每项为 (自然排序键, 完整路径)。
+    - 正则在扫描时立即过滤，排序键只为通过筛选的文件计算一次。
+    - 与 os.walk 一致：不进入指向目录的符号链接，无权限的目录被静默跳过。
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if recursive and not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if compiled_regex is not None and not compiled_regex.search(entry.name):
+                    continue
+                files.append((natural_sort_key(entry.name), entry.path))
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def discover_files(input_dir, regex_pattern=None, recursive=False, workers=DEFAULT_SCAN_WORKERS, profile=None):
+    """
+    发现并按文件名自然排序所有符合条件的文件，返回完整路径列表。
+    - recursive 为真时，子目录在 workers 个线程中并行扫描 (workers <= 1 时顺序扫描)。
+    - 排序只比较预先计算好的键；文件名相同时按完整路径排序，保证结果与扫描顺序无关。
+    - 传入 profile 时分别记录扫描 (scan) 与排序 (sort) 的耗时。
+    """
+    scan_start = time.perf_counter()
+    compiled_regex = re.compile(regex_pattern) if regex_pattern else None
+    keyed_files = []
+
+    if not recursive or workers <= 1:
+        pending = [input_dir]
+        while pending:
+            files, subdirs = scan_directory(pending.pop(), compiled_regex, recursive)
+            keyed_files.extend(files)
+            pending.extend(subdirs)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(scan_directory, input_dir, compiled_regex, recursive)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    keyed_files.extend(files)
+                    for subdir in subdirs:
+                        futures.add(executor.submit(scan_directory, subdir, compiled_regex, recursive))
+
+    sort_start = time.perf_counter()
+    record_stage(profile, "scan", sort_start - scan_start, len(keyed_files))
+    keyed_files.sort()
+    record_stage(profile, "sort", time.perf_counter() - sort_start, len(keyed_files))
+    return [path for _, path in keyed_files]
+
+
+def new_profile():
+    """创建一个线程安全的阶段计时记录: 每个阶段累计 (耗时, 次数, 字节数)。"""
+    return {"lock": threading.Lock(), "stages": {}}
+
+
+def record_stage(profile, stage, seconds, count=1, nbytes=0):
+    """向 profile 累加一次阶段计时；profile 为 None (未启用 --profile) 时什么也不做。"""
+    if profile is None:
+        return
+    with profile["lock"]:
+        entry = profile["stages"].setdefault(stage, {"seconds": 0.0, "count": 0, "bytes": 0})
+        entry["seconds"] += seconds
+        entry["count"] += count
+        entry["bytes"] += nbytes
+
+
+def write_profile_report(profile, report_path, wall_seconds, frames, settings):
+    """
+    打印各阶段的耗时、次数、帧/s 与 MB/s，并将同样的内容写成 JSON 报告。
+    - 多线程阶段 (解码、缩放等) 的耗时是各线程耗时之和，可能超过总耗时；
+      其吞吐量因此表示单线程速度，乘以线程数即为该阶段的理论上限。
+    """
+    stages = {}
+    for stage in sorted(profile["stages"], key=lambda name: list(PROFILE_STAGE_LABELS).index(name)):
+        entry = profile["stages"][stage]
+        seconds = entry["seconds"]
+        stages[stage] = {
+            "seconds": round(seconds, 6),
+            "count": entry["count"],
+            "bytes": entry["bytes"],
+            "items_per_second": round(entry["count"] / seconds, 3) if seconds > 0 else None,
+            "mb_per_second": round(entry["bytes"] / seconds / 1e6, 3) if seconds > 0 and entry["bytes"] else None,
+        }
+    report = {
+        "wall_seconds": round(wall_seconds, 6),
+        "frames": frames,
+        "frames_per_second": round(frames / wall_seconds, 3) if wall_seconds > 0 else None,
+        "settings": settings,
+        "stages": stages,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    def pad(text, width):
+        # 中文字符按两列宽度对齐
+        return text + ' ' * max(1, width - sum(2 if ord(c) > 127 else 1 for c in text))
+
+    print("\n--- ⏱️ 性能剖析 ---")
+    print(f"{pad('阶段', 18)}{pad('耗时(s)', 10)}{pad('次数', 10)}{pad('个/s', 12)}MB/s")
+    for stage, entry in stages.items():
+        rate = f"{entry['items_per_second']:.1f}" if entry['items_per_second'] is not None else "-"
+        mbps = f"{entry['mb_per_second']:.1f}" if entry['mb_per_second'] is not None else "-"
+        seconds = f"{entry['seconds']:.3f}"
+        print(f"{pad(PROFILE_STAGE_LABELS[stage], 18)}{pad(seconds, 10)}{pad(str(entry['count']), 10)}{pad(rate, 12)}{mbps}")
+    print(f"总耗时: {wall_seconds:.3f}s，{frames} 帧，平均 {report['frames_per_second'] or 0:.1f} 帧/s")
+    print(f"📝 剖析报告已保存至: {os.path.abspath(report_path)}")
+    print("----------------------")
+    return report
+
+
+def probe_image_header(image_path):
+    """
+    只读取图片文件头 (PIL 惰性打开，不解码像素)。
+    返回 (路径, 宽, 高, 颜色模式, EXIF 方向)；宽高为按 EXIF 方向旋转后的显示尺寸，与 load_frame 的解码结果一致。
+    读取失败时抛出异常。
+    """
+    with Image.open(image_path) as img:
+        width, height = img.size
+        orientation = img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+        if orientation in EXIF_TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        return image_path, width, height, img.mode, orientation
+
+
+def probe_image_headers(files, workers=DEFAULT_PROBE_WORKERS):
+    """
+    并行探测所有图片的文件头，返回 (尺寸表, 失败列表)。
+    - 尺寸表: 按输入顺序排列的 (路径, 宽, 高, 颜色模式, EXIF 方向) 元组列表。
+    - 失败列表: (路径, 异常) 元组列表，这些文件不会进入尺寸表。
+    """
+    def safe_probe(image_path):
+        try:
+            return probe_image_header(image_path), None
+        except Exception as e:
+            return None, (image_path, e)
+
+    table = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # executor.map 保持输入顺序
+        for entry, failure in tqdm(
+            executor.map(safe_probe, files), total=len(files), desc="探测图片头", unit="张", ncols=100,
+            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]',
+            leave=False,
+        ):
+            if entry is not None:
+                table.append(entry)
+            else:
+                failures.append(failure)
+    return table, failures
+
+
+def choose_target_size(table, strategy='first'):
+    """
+    根据尺寸表选择视频尺寸 (宽, 高)。
+    - 'first':       第一张图片的尺寸。
+    - 'most-common': 出现次数最多的尺寸 (并列时取先出现者)。
+    - 'max':         面积最大的尺寸 (其余图片将被放大)。
+    """
+    sizes = [(width, height) for _, width, height, _, _ in table]
+    if strategy == 'most-common':
+        return Counter(sizes).most_common(1)[0][0]
+    if strategy == 'max':
+        return max(sizes, key=lambda size: size[0] * size[1])
+    return sizes[0]
+
+
+# 每个读图线程各自持有的临时缓冲区 (按名称、形状与类型缓存，仅在首次遇到时分配)
+thread_scratch = threading.local()
+
+
+def get_scratch(name, shape, dtype):
+    """返回当前线程可重复使用的临时缓冲区。"""
+    buffers = thread_scratch.__dict__.setdefault('buffers', {})
+    key = (name, shape, np.dtype(dtype).str)
+    buffer = buffers.get(key)
+    if buffer is None:
+        buffer = buffers[key] = np.empty(shape, dtype=dtype)
+    return buffer
+
+
+def sample_max(dtype):
+    """像素类型的满量程值: 整数类型取最大值，浮点类型视为 0~1。"""
+    return float(np.iinfo(dtype).max) if np.issubdtype(dtype, np.integer) else 1.0
+
+
+def scale_into(src, out):
+    """把 3 通道的 src 按满量程比例换算并写入预分配的 out (uint8 或 uint16)，不分配新的整帧数组。"""
+    import cv2
+
+    if src.dtype == out.dtype:
+        np.copyto(out, src)
+    elif out.dtype == np.uint8:
+        # convertScaleAbs 同时完成缩放、四舍五入与饱和截断
+        cv2.convertScaleAbs(src, dst=out, alpha=255.0 / sample_max(src.dtype))
+    elif src.dtype == np.uint8:
+        np.multiply(src, np.uint16(257), out=out)
+    else:
+        scratch = get_scratch('scale', src.shape, np.float32)
+        np.multiply(src, np.float32(65535.0 / sample_max(src.dtype)), out=scratch)
+        np.clip(scratch, 0, 65535, out=scratch)
+        np.add(scratch, np.float32(0.5), out=scratch)
+        np.copyto(out, scratch, casting='unsafe')
+    return out
+
+
+def normalize_frame(frame, out, background=DEFAULT_BACKGROUND):
+    """
+    将任意格式的帧归一化为 out 的格式 (3 通道，uint8 或 uint16)，结果写入预分配的 out 并返回。
+    - 灰度 (2 维或单通道): 扩展为 3 通道。
+    - 4 通道: 按 alpha 与 background (8 位、与帧相同的通道顺序) 合成。
+    - 16 位 / 浮点: 按满量程比例换算位深。
+    - 已经是目标格式的帧原样返回，不做任何拷贝。
+    所有运算都是整帧的向量化 cv2/NumPy 操作，中间结果使用线程内复用的缓冲区。
+    """
+    import cv2
+
+    if frame.ndim == 3 and frame.shape[2] == 1:
+        frame = frame[:, :, 0]
+    channels = 1 if frame.ndim == 2 else frame.shape[2]
+
+    if channels == 3:
+        if frame.dtype == out.dtype:
+            return frame
+        return scale_into(frame, out)
+
+    if channels == 1:
+        if frame.dtype == out.dtype:
+            return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=out)
+        expanded = get_scratch('gray', frame.shape + (3,), frame.dtype)
+        cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=expanded)
+        return scale_into(expanded, out)
+
+    if channels == 4:
+        # 在源位深下合成: result = bg + (fg - bg) * alpha，全部使用 float32 缓冲区原地计算
+        source_max = sample_max(frame.dtype)
+        height, width = frame.shape[:2]
+        alpha = get_scratch('alpha', (height, width, 1), np.float32)
+        color = get_scratch('color', (height, width, 3), np.float32)
+        bg = np.asarray(background, dtype=np.float32) * np.float32(source_max / 255.0)
+        np.multiply(frame[:, :, 3:4], np.float32(1.0 / source_max), out=alpha)
+        np.subtract(frame[:, :, :3], bg, out=color)
+        np.multiply(color, alpha, out=color)
+        np.add(color, bg, out=color)
+        if out.dtype == np.uint8:
+            cv2.convertScaleAbs(color, dst=out, alpha=255.0 / source_max)
+        else:
+            np.multiply(color, np.float32(65535.0 / source_max), out=color)
+            np.add(color, np.float32(0.5), out=color)
+            np.copyto(out, color, casting='unsafe')
+        return out
+
+    raise ValueError(f"不支持的通道数: {channels}")
+
+
+def apply_orientation(frame, orientation):
+    """按 EXIF 方向值 (1~8) 旋转/翻转帧，结果与 PIL 的 ImageOps.exif_transpose 一致。"""
+    import cv2
+
+    if orientation == 2:
+        return cv2.flip(frame, 1)
+    if orientation == 3:
+        return cv2.rotate(frame, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(frame, 0)
+    if orientation == 5:
+        return cv2.transpose(frame)
+    if orientation == 6:
+        return cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(frame), -1)
+    if orientation == 8:
+        return cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return frame
+
+
+def load_frame(image_path, size, out=None, background=DEFAULT_BACKGROUND, profile=None, orientation=1):
+    """
+    在读图线程中以原始格式 (IMREAD_UNCHANGED: 保留位深、alpha 与灰度) 解码单张图片，
+    按探测阶段读到的 EXIF 方向旋转/翻转 (IMREAD_UNCHANGED 不会自动处理)，
+    在尺寸不符时缩放到 size (宽, 高)，再归一化到 out 的格式。
+    - out 为 None 时按 8 位 BGR 归一化 (仅在需要转换时分配)。
+    - 传入 profile 时记录 imread (按文件大小计 MB/s)、resize 与 normalize (仅实际发生转换时) 的耗时。
+    返回 (帧图像, 原始尺寸)；无法读取时帧图像为 None。
+    """
+    import cv2
+
+    start = time.perf_counter()
+    frame = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if profile is not None:
+        record_stage(profile, "imread", time.perf_counter() - start, 1, os.path.getsize(image_path))
+    if frame is None:
+        return None, None
+    if orientation != 1:
+        frame = apply_orientation(frame, orientation)
+    frame_h, frame_w = frame.shape[:2]
+    if (frame_w, frame_h) != size:
+        start = time.perf_counter()
+        frame = cv2.resize(frame, size)
+        record_stage(profile, "resize", time.perf_counter() - start, 1, frame.nbytes)
+    if out is None:
+        out = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    start = time.perf_counter()
+    normalized = normalize_frame(frame, out, background)
+    if normalized is not frame:
+        record_stage(profile, "normalize", time.perf_counter() - start, 1, normalized.nbytes)
+    return normalized, (frame_w, frame_h)
+
+
+def iter_decoded_frames(files, size, workers=DEFAULT_READ_WORKERS, prefetch=None, bit_depth=8, background=DEFAULT_BACKGROUND, profile=None, orientations=None):
+    """
+    按原顺序逐个产出 (图片路径, 帧图像, 原始尺寸, 异常)。
+    解码与缩放在 workers 个线程中进行；最多提前提交 prefetch 张图片，
+    先进先出的任务队列本身就是重排缓冲区，保证写出顺序与输入顺序严格一致。
+    - orientations 为 {路径: EXIF 方向} (只需包含方向不为 1 的图片)，由探测阶段得到。
+    - 需要格式转换的帧写入 prefetch + 1 个预分配的环形缓冲区 (bit_depth=8 为 uint8，10 为 uint16)：
+      在途任务至多 prefetch 个，加上调用方正在使用的一帧，缓冲区不会被提前覆盖。
+      因此调用方必须在请求下一帧之前用完 (写出) 当前帧。
+    """
+    workers = max(1, workers)
+    prefetch = max(1, prefetch if prefetch is not None else workers * 2)
+    dtype = BIT_DEPTH_PIX_FMTS[bit_depth]["dtype"]
+    ring = [np.empty((size[1], size[0], 3), dtype=dtype) for _ in range(prefetch + 1)]
+    pending = deque()
+    file_iter = iter(files)
+    submitted = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit(image_path):
+            nonlocal submitted
+            out = ring[submitted % len(ring)]
+            submitted += 1
+            orientation = orientations.get(image_path, 1) if orientations else 1
+            pending.append((image_path, executor.submit(load_frame, image_path, size, out, background, profile, orientation)))
+
+        for image_path in file_iter:
+            submit(image_path)
+            if len(pending) >= prefetch:
+                break
+
+        while pending:
+            image_path, future = pending.popleft()
+            # 取走一张的同时补充一张，使在途任务数保持在 prefetch 以内
+            next_path = next(file_iter, None)
+            if next_path is not None:
+                submit(next_path)
+            try:
+                frame, original_size = future.result()
+                yield image_path, frame, original_size, None
+            except Exception as e:
+                yield image_path, None, None, e
+
+
+def resolve_encoder_options(codec, profile=None, **overrides):
+    """
+    合并命名档位与显式参数，返回编码器选项字典 (preset, crf, bitrate, threads, gop, tune)。
+    - 显式给出的 (非 None) 参数覆盖档位中的值；指定了码率时忽略档位中的 CRF。
+    """
+    options = {}
+    if profile:
+        profile_values = ENCODE_PROFILES[profile]
+        options["preset"] = profile_values["preset"]
+        if overrides.get("bitrate") is None:
+            options["crf"] = profile_values["crf"][codec]
+    for key, value in overrides.items():
+        if value is not None:
+            options[key] = value
+    return options
+
+
+def build_encoder_args(codec, encoder_options=None):
+    """
+    根据编码器选项生成 ffmpeg 的编码参数 (位于 -c:v 之后)。
+    - libaom-av1 的预设映射为 -cpu-used，CRF 模式需搭配 -b:v 0，并开启 -row-mt 以利用多线程。
+    """
+    encoder_options = encoder_options or {}
+    args = []
+    preset = encoder_options.get("preset")
+    crf = encoder_options.get("crf")
+    bitrate = encoder_options.get("bitrate")
+
+    if codec == 'av1':
+        if preset is not None:
+            args += ['-cpu-used', str(AV1_CPU_USED_MAP[preset])]
+        args += ['-row-mt', '1']
+        if crf is not None:
+            args += ['-crf', str(crf)]
+            if bitrate is None:
+                args += ['-b:v', '0']
+    else:
+        if preset is not None:
+            args += ['-preset', preset]
+        if crf is not None:
+            args += ['-crf', str(crf)]
+
+    if bitrate is not None:
+        args += ['-b:v', str(bitrate)]
+    if encoder_options.get("tune") is not None:
+        args += ['-tune', encoder_options["tune"]]
+    if encoder_options.get("gop") is not None:
+        args += ['-g', str(encoder_options["gop"])]
+    if encoder_options.get("threads") is not None:
+        args += ['-threads', str(encoder_options["threads"])]
+    return args
+
+
+def pipe_frames_to_ffmpeg(frame_items, total, size, fps, output_video_path, codec='h264', overwrite=False, desc="视频编码中", encoder_options=None, pbar=None, input_pix_fmt='bgr24', output_pix_fmt='yuv420p', profile=None):
+    """
+    将帧以原始像素流 (默认 bgr24，RGB 帧可传 input_pix_fmt='rgb24' 免去转换) 的形式写入 ffmpeg 的 stdin 进行编码。
+    - 10 位输出时传入 uint16 帧，并设置 input_pix_fmt='bgr48le' / output_pix_fmt='yuv420p10le'。
+    - frame_items: 逐个产出 (标签, 帧图像, 原始尺寸, 异常) 的可迭代对象，与 iter_decoded_frames 的输出一致。
+    - 尺寸与 size (宽, 高) 不符的帧会被自动缩放 (由 iter_decoded_frames 产出的帧已在读图线程中缩放)；ffmpeg 的 stderr 写入临时文件，仅在失败时打印。
+    - 传入 pbar 时复用该进度条 (分段并行编码时多个管道共享一个进度条)，否则自行创建。
+    - 返回成功写入的帧数；ffmpeg 启动或编码失败时返回 None。
+    """
+    import cv2
+
+    width, height = size
+    video_codec = FFMPEG_CODEC_MAP[codec]
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-f', 'rawvideo',
+        '-pix_fmt', input_pix_fmt,
+        '-s', f'{width}x{height}',
+        '-r', str(fps),
+        '-i', '-',
+        '-c:v', video_codec,
+        *build_encoder_args(codec, encoder_options),
+        '-pix_fmt', output_pix_fmt, # 默认 yuv420p 以保证最佳兼容性
+        '-y' if overwrite else '-n',
+        output_video_path,
+    ]
+
+    processed_count = 0
+    with tempfile.TemporaryFile() as ffmpeg_log:
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=ffmpeg_log)
+        except OSError as e:
+            print(f"\n🔴 错误: 无法启动 FFmpeg: {e}")
+            return None
+
+        progress = nullcontext(pbar) if pbar is not None else tqdm(
+            total=total, desc=desc, unit="帧", ncols=100,
+            bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]',
+        )
+        with progress as pbar:
+            try:
+                for label, frame, original_size, error in frame_items:
+                    try:
+                        if error is not None:
+                            raise error
+                        if frame is None:
+                            tqdm.write(f"🟡 警告: 无法读取图片 '{label}'，已跳过。")
+                            continue
+
+                        frame_h, frame_w = frame.shape[:2]
+                        if (frame_w, frame_h) != (width, height):
+                            # 图片序列的尺寸差异已在探测阶段统一报告，这里只会遇到调用方传入的内存帧
+                            tqdm.write(f"🟡 警告: '{label}' 的尺寸 ({frame_w}x{frame_h}) 与视频尺寸 ({width}x{height}) 不符，已自动缩放。")
+                            frame = cv2.resize(frame, (width, height))
+
+                        write_start = time.perf_counter()
+                        process.stdin.write(memoryview(frame.data if frame.flags.c_contiguous else frame.copy().data))
+                        # 管道写满时会阻塞，因此该阶段偏慢说明瓶颈在 ffmpeg 编码
+                        record_stage(profile, "write", time.perf_counter() - write_start, 1, frame.nbytes)
+                        processed_count += 1
+                    except BrokenPipeError:
+                        # ffmpeg 提前退出，错误信息见下方的日志
+                        break
+                    except Exception as e:
+                        tqdm.write(f"🔴 错误: 处理 '{label}' 时发生错误: {e}")
+                    finally:
+                        pbar.update(1)
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                finish_start = time.perf_counter()
+                returncode = process.wait()
+                record_stage(profile, "finish", time.perf_counter() - finish_start)
+
+        if returncode != 0:
+            ffmpeg_log.seek(0)
+            tqdm.write("\n🔴 错误: FFmpeg 执行失败。")
+            tqdm.write("--- FFmpeg 输出 ---")
+            tqdm.write(ffmpeg_log.read().decode('utf-8', errors='replace'))
+            tqdm.write("--------------------")
+            return None
+
+    return processed_count
+
+
+def open_frame_source(frames):
+    """
+    将各种帧来源统一为可迭代对象，返回 (可迭代对象, 帧数或 None, 默认通道顺序)。
+    - str / PathLike: .npy 帧数组文件 (N x H x W x 3)，以内存映射方式打开，逐帧按需读取。
+    - numpy 数组: N x H x W x 3 的帧数组 (包括已打开的 memmap)。
+    - 其他: 列表、元组或生成器，每个元素为 H x W x 3 的 uint8 数组。
+    """
+    if isinstance(frames, (str, os.PathLike)):
+        stack = np.load(frames, mmap_mode='r')
+        if stack.ndim != 4:
+            raise ValueError(f"'{frames}' 的形状为 {stack.shape}，应为 (帧数, 高, 宽, 通道)。")
+        return stack, len(stack), NPY_DEFAULT_CHANNEL_ORDER
+    if isinstance(frames, np.ndarray):
+        if frames.ndim != 4:
+            raise ValueError(f"帧数组的形状为 {frames.shape}，应为 (帧数, 高, 宽, 通道)。")
+        return frames, len(frames), 'bgr'
+    return frames, (len(frames) if hasattr(frames, '__len__') else None), 'bgr'
+
+
+def encode_frames(
+    frames,
+    output_video_path,
+    fps=None,
+    duration=None,
+    mode='ffmpeg',
+    codec='h264',
+    overwrite=False,
+    total=None,
+    encoder_options=None,
+    channel_order=None,
+    bit_depth=8,
+    background=DEFAULT_BACKGROUND,
+):
+    """
+    将内存中的帧 (无需先写成图片) 编码为视频，供渲染管线等直接调用。
+    - frames: 帧数组 (N x H x W x C)、.npy 文件路径 (内存映射读取)，或逐帧产出 H x W x C 数组的列表/生成器。
+      灰度、带 alpha (与 background 合成)、16 位或浮点 (0~1) 帧会经 normalize_frame 归一化到同一个预分配缓冲区。
+    - fps / duration 二选一；按时长计算帧率需要已知帧数 (数组、列表，或通过 total 传入)。
+    - mode: 'ffmpeg' / 'ffmpeg-pipe' (以原始像素流送入 ffmpeg) 或 'opencv' (VideoWriter)。
+    - channel_order: 'bgr' 或 'rgb'；默认 .npy 文件按 RGB (与 video_to_images.py 的 npy 输出一致)，其余按 BGR。
+    - 视频尺寸取第一帧的尺寸，其余尺寸不符的帧会被自动缩放。encoder_options 可由 resolve_encoder_options 生成。
+    - bit_depth=10 时以 16 位像素流送入 ffmpeg 并编码为 yuv420p10le (仅 FFmpeg 后端)。
+    - 返回成功写入的帧数；失败时返回 None。
+    """
+    if os.path.exists(output_video_path) and not overwrite:
+        print(f"\n🔴 错误: 输出文件 '{output_video_path}' 已存在。")
+        return None
+    if mode in ('ffmpeg', 'ffmpeg-pipe') and not shutil.which("ffmpeg"):
+        print("\n🔴 错误: 'ffmpeg' 命令未找到。")
+        print("请安装 FFmpeg 并确保它在系统的 PATH 环境变量中。")
+        return None
+
+    try:
+        frames, source_total, default_channel_order = open_frame_source(frames)
+    except (OSError, ValueError) as e:
+        print(f"\n🔴 错误: 无法打开帧来源: {e}")
+        return None
+    total = total if total is not None else source_total
+    channel_order = (channel_order or default_channel_order).lower()
+    if channel_order not in ('bgr', 'rgb'):
+        print(f"\n🔴 错误: 不支持的通道顺序 '{channel_order}'，应为 'bgr' 或 'rgb'。")
+        return None
+    if bit_depth != 8 and mode == 'opencv':
+        print("\n🔴 错误: OpenCV 后端只支持 8 位输出，10 位输出请使用 mode='ffmpeg'。")
+        return None
+
+    # --- 计算最终帧率 ---
+    if duration:
+        if duration <= 0:
+            print("\n🔴 错误: duration 必须是正数。")
+            return None
+        if not total:
+            print("\n🔴 错误: 按时长计算帧率需要已知帧数，请传入 total 或改用 fps。")
+            return None
+        fps = total / duration
+    elif not fps:
+        print("\n🔴 错误: 必须指定 fps 或 duration。")
+        return None
+
+    frame_iter = iter(frames)
+    first_frame = next(frame_iter, None)
+    if first_frame is None:
+        print("\n⚠️ 没有可编码的帧。")
+        return None
+    if first_frame.ndim not in (2, 3) or (first_frame.ndim == 3 and first_frame.shape[2] not in (1, 3, 4)) \
+            or not (np.issubdtype(first_frame.dtype, np.integer) or np.issubdtype(first_frame.dtype, np.floating)):
+        print(f"\n🔴 错误: 帧的形状/类型为 {first_frame.shape} {first_frame.dtype}，应为 (高, 宽[, 1/3/4]) 的整数或浮点数组。")
+        return None
+    height, width = first_frame.shape[:2]
+
+    import cv2
+
+    # 编码器同步地消费每一帧，因此一个缓冲区即可被所有帧复用；背景色与帧使用相同的通道顺序
+    normalized = np.empty((height, width, 3), dtype=BIT_DEPTH_PIX_FMTS[bit_depth]["dtype"])
+    bgr_buffer = np.empty((height, width, 3), dtype=np.uint8)
+    ordered_background = tuple(reversed(background)) if channel_order == 'rgb' else tuple(background)
+
+    def frame_items():
+        for index, frame in enumerate(itertools.chain([first_frame], frame_iter)):
+            label = f"#{index}"
+            if frame.shape[:2] != (height, width):
+                tqdm.write(f"🟡 警告: '{label}' 的尺寸 ({frame.shape[1]}x{frame.shape[0]}) 与视频尺寸 ({width}x{height}) 不符，已自动缩放。")
+                frame = cv2.resize(np.asarray(frame), (width, height))
+            try:
+                yield label, normalize_frame(frame, normalized, ordered_background), None, None
+            except ValueError as e:
+                yield label, None, None, e
+
+    output_dir = os.path.dirname(output_video_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if mode in ('ffmpeg', 'ffmpeg-pipe'):
+        return pipe_frames_to_ffmpeg(
+            frame_items(), total, (width, height), fps, output_video_path,
+            codec=codec, overwrite=overwrite, encoder_options=encoder_options,
+            input_pix_fmt=BIT_DEPTH_PIX_FMTS[bit_depth][channel_order],
+            output_pix_fmt=BIT_DEPTH_PIX_FMTS[bit_depth]["output"],
+        )
+
+    video_writer = cv2.VideoWriter(output_video_path, cv2.VideoWriter_fourcc(*OPENCV_FOURCC_MAP[codec]), fps, (width, height))
+    if not video_writer.isOpened():
+        print("\n🔴 错误: 无法初始化 VideoWriter。")
+        print(f"   - 请检查 OpenCV 安装是否支持所选编码器 ('{OPENCV_FOURCC_MAP[codec]}')，或改用 mode='ffmpeg'。")
+        return None
+
+    processed_count = 0
+    try:
+        with tqdm(total=total, desc="视频编码中", unit="帧", ncols=100, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]') as pbar:
+            for label, frame, _, error in frame_items():
+                try:
+                    if error is not None:
+                        raise error
+                    if channel_order == 'rgb':
+                        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=bgr_buffer)
+                    video_writer.write(np.ascontiguousarray(frame))
+                    processed_count += 1
+                except Exception as e:
+                    tqdm.write(f"🔴 错误: 处理 '{label}' 时发生错误: {e}")
+                finally:
+                    pbar.update(1)
+    finally:
+        video_writer.release()
+    return processed_count
+
+
+def build_ffmpeg_concat_command(list_path, output_video_path, fps, codec, overwrite=False, encoder_options=None, bit_depth=8):
+    """构建通过 concat 文件列表读取图片序列并编码的 ffmpeg 命令 (图片由 ffmpeg 自行解码)。"""
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',  # 隐藏版本信息
+        '-r', str(round(fps, 2)),
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_path,
+        '-c:v', FFMPEG_CODEC_MAP[codec],
+        *build_encoder_args(codec, encoder_options),
+        '-pix_fmt', BIT_DEPTH_PIX_FMTS[bit_depth]["output"], # 8 位时为 yuv420p，保证最佳兼容性
+    ]
+    if overwrite:
+        cmd.append('-y')
+    cmd.append(output_video_path)
+    return cmd
+
+
+def write_concat_list(paths, list_path):
+    """写出 ffmpeg concat 分离器使用的文件列表 (路径中的单引号按 concat 语法转义)。"""
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def write_frames_with_opencv(video_writer, files, size, pbar, workers=DEFAULT_READ_WORKERS, prefetch=None, background=DEFAULT_BACKGROUND, profile=None, orientations=None):
+    """将图片按顺序并行解码、归一化为 8 位 BGR 后写入已打开的 VideoWriter，返回成功写入的帧数。"""
+    processed_count = 0
+    for image_path, frame, original_size, error in iter_decoded_frames(
+        files, size, workers=workers, prefetch=prefetch, background=background, profile=profile, orientations=orientations
+    ):
+        try:
+            if error is not None:
+                raise error
+            if frame is None:
+                tqdm.write(f"🟡 警告: 无法读取图片 '{os.path.basename(image_path)}'，已跳过。")
+                continue
+
+            write_start = time.perf_counter()
+            video_writer.write(frame)
+            record_stage(profile, "write", time.perf_counter() - write_start, 1, frame.nbytes)
+            processed_count += 1
+        except Exception as e:
+            tqdm.write(f"🔴 错误: 处理 '{os.path.basename(image_path)}' 时发生错误: {e}")
+        finally:
+            pbar.update(1)
+    return processed_count
+
+
+def plan_chunks(total, chunks, gop):
+    """
+    将 total 帧切分为至多 chunks 个连续分段，返回 [(起始, 结束), ...]。
+    - 每段长度向上取整为 gop 的整数倍，使分段边界与关键帧对齐；帧数较少时实际段数可能少于 chunks。
+    """
+    chunk_length = -(-total // max(1, chunks))
+    chunk_length = -(-chunk_length // gop) * gop
+    return [(start, min(start + chunk_length, total)) for start in range(0, total, chunk_length)]
+
+
+def encode_chunk(chunk_files, segment_path, mode, codec, size, fps, pbar, workers=DEFAULT_READ_WORKERS, prefetch=None, encoder_options=None, bit_depth=8, background=DEFAULT_BACKGROUND, profile=None, list_dir=None, orientations=None):
+    """
+    用独立的编码器实例把一个分段编码为 segment_path，返回成功写入的帧数；失败时返回 None。
+    - 'ffmpeg-pipe' 与 'opencv' 逐帧更新共享进度条，'ffmpeg' 在整段完成后一次性更新。
+    - 'ffmpeg' 模式的 concat 文件列表写入 list_dir (临时目录，默认与分段同目录)，不会残留在缓存目录中。
+    """
+    if mode == 'ffmpeg-pipe':
+        frame_items = (
+            (os.path.basename(image_path), frame, original_size, error)
+            for image_path, frame, original_size, error in iter_decoded_frames(
+                chunk_files, size, workers=workers, prefetch=prefetch, bit_depth=bit_depth, background=background,
+                profile=profile, orientations=orientations,
+            )
+        )
+        return pipe_frames_to_ffmpeg(
+            frame_items, len(chunk_files), size, fps, segment_path,
+            codec=codec, overwrite=True, encoder_options=encoder_options, pbar=pbar,
+            input_pix_fmt=BIT_DEPTH_PIX_FMTS[bit_depth]["bgr"], output_pix_fmt=BIT_DEPTH_PIX_FMTS[bit_depth]["output"],
+            profile=profile,
+        )
+
+    if mode == 'ffmpeg':
+        list_path = os.path.join(list_dir or os.path.dirname(segment_path), os.path.splitext(os.path.basename(segment_path))[0] + '.txt')
+        write_concat_list(chunk_files, list_path)
+        cmd = build_ffmpeg_concat_command(list_path, segment_path, fps, codec, overwrite=True, encoder_options=encoder_options, bit_depth=bit_depth)
+        ffmpeg_start = time.perf_counter()
+        result = subprocess.run(cmd, check=False, capture_output=True, text=True, encoding='utf-8')
+        record_stage(profile, "ffmpeg", time.perf_counter() - ffmpeg_start, len(chunk_files))
+        if result.returncode != 0:
+            tqdm.write(f"\n🔴 错误: 分段 '{os.path.basename(segment_path)}' 的 FFmpeg 执行失败。")
+            tqdm.write("--- FFmpeg 输出 ---")
+            tqdm.write(result.stderr)
+            tqdm.write("--------------------")
+            return None
+        pbar.update(len(chunk_files))
+        return len(chunk_files)
+
+    import cv2
+
+    video_writer = cv2.VideoWriter(segment_path, cv2.VideoWriter_fourcc(*OPENCV_FOURCC_MAP[codec]), fps, size)
+    if not video_writer.isOpened():
+        tqdm.write(f"\n🔴 错误: 无法为分段 '{os.path.basename(segment_path)}' 初始化 VideoWriter。")
+        return None
+    try:
+        return write_frames_with_opencv(
+            video_writer, chunk_files, size, pbar, workers=workers, prefetch=prefetch, background=background, profile=profile,
+            orientations=orientations,
+        )
+    finally:
+        video_writer.release()
+
+
+def concat_segments(segment_paths, output_video_path, list_dir, overwrite=False):
+    """使用 ffmpeg 的 concat 分离器以流复制 (-c copy) 方式无损拼接分段，成功返回 True。"""
+    list_path = os.path.join(list_dir, 'segments.txt')
+    write_concat_list(segment_paths, list_path)
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-loglevel', 'error',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_path,
+        '-c', 'copy',
+        '-y' if overwrite else '-n',
+        output_video_path,
+    ]
+    result = subprocess.run(cmd, check=False, capture_output=True, text=True, encoding='utf-8')
+    if result.returncode != 0:
+        print("\n🔴 错误: 拼接分段失败。")
+        print("--- FFmpeg 输出 ---")
+        print(result.stderr)
+        print("--------------------")
+        return False
+    return True
+
+
+def chunk_cache_key(chunk_files, encode_params):
+    """
+    计算分段的缓存键: 对编码参数以及分段内每个文件的 (绝对路径, 大小, 修改时间) 做 SHA-256。
+    只改动了部分图片时，其余分段的键保持不变，可直接复用已编码的分段。
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(dict(encode_params, version=CACHE_KEY_VERSION), sort_keys=True).encode('utf-8'))
+    for path in chunk_files:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def encode_in_chunks(files, output_video_path, mode, codec, size, fps, chunks, overwrite=False, workers=DEFAULT_READ_WORKERS, prefetch=None, encoder_options=None, cache_dir=None, bit_depth=8, background=DEFAULT_BACKGROUND, profile=None, orientations=None):
+    """
+    分段并行编码: 将有序文件列表切分为与 GOP 对齐的分段，由多个编码器实例同时编码，
+    最后通过 concat 分离器以流复制方式拼接为一个可无缝播放的视频。返回成功写入的帧数。
+    - FFmpeg 模式下每段强制使用相同的 -g，保证拼接后关键帧节奏一致。
+    - 读图线程在各分段间平均分配；分段文件写在输出目录下的临时目录中，结束后清理。
+    - 指定 cache_dir 时，分段长度固定为 CACHE_SEGMENT_GOPS 个 GOP，编码结果按 chunk_cache_key 保存在缓存目录中；
+      再次运行时只重新编码键发生变化的分段，最多 chunks 个分段同时编码。
+    """
+    gop = (encoder_options or {}).get('gop') or DEFAULT_CHUNK_GOP
+    if cache_dir:
+        segment_length = CACHE_SEGMENT_GOPS * gop
+        ranges = [(start, min(start + segment_length, len(files))) for start in range(0, len(files), segment_length)]
+    else:
+        ranges = plan_chunks(len(files), chunks, gop)
+    chunk_options = dict(encoder_options or {}, gop=gop) if mode != 'opencv' else encoder_options
+    print(f"   - 分段{'缓存' if cache_dir else '并行'}编码: {len(ranges)} 段，每段至多 {ranges[0][1] - ranges[0][0]} 帧 (按 GOP={gop} 对齐)")
+
+    extension = os.path.splitext(output_video_path)[1] or '.mp4'
+    segment_dir = tempfile.mkdtemp(prefix='.chunks_', dir=os.path.dirname(os.path.abspath(output_video_path)))
+
+    # --- 规划每个分段: 命中缓存的直接复用，其余加入编码任务 ---
+    segment_paths = []
+    counts = [None] * len(ranges)
+    jobs = []  # (分段序号, 编码输出路径, 缓存路径或 None)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        encode_params = {
+            "mode": mode,
+            "codec": codec,
+            "size": list(size),
+            "fps": fps,
+            "encoder_options": chunk_options or {},
+            "bit_depth": bit_depth,
+            "background": list(background),
+        }
+    for i, (start, end) in enumerate(ranges):
+        if not cache_dir:
+            segment_path = os.path.join(segment_dir, f"segment_{i:04d}{extension}")
+            jobs.append((i, segment_path, None))
+            segment_paths.append(segment_path)
+            continue
+        key = chunk_cache_key(files[start:end], encode_params)
+        cached_path = os.path.join(cache_dir, f"{key}{extension}")
+        meta_path = os.path.join(cache_dir, f"{key}.json")
+        if os.path.exists(cached_path) and os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    counts[i] = json.load(f)["frames"]
+            except (OSError, ValueError, KeyError):
+                counts[i] = None
+        if counts[i] is None:
+            jobs.append((i, os.path.join(cache_dir, f"{key}.partial{extension}"), cached_path))
+        segment_paths.append(cached_path)
+
+    if cache_dir:
+        print(f"   - 缓存命中 {len(ranges) - len(jobs)} / {len(ranges)} 段，需要编码 {len(jobs)} 段 (缓存目录: {cache_dir})")
+
+    def run_job(job):
+        i, encode_path, cached_path = job
+        start, end = ranges[i]
+        count = encode_chunk(
+            files[start:end], encode_path, mode, codec, size, fps, pbar,
+            workers=chunk_workers, prefetch=prefetch, encoder_options=chunk_options,
+            bit_depth=bit_depth, background=background, profile=profile, list_dir=segment_dir, orientations=orientations,
+        )
+        if count is not None and cached_path is not None:
+            # 先写完整的分段再原子地改名，中断的编码不会留下看似有效的缓存
+            os.replace(encode_path, cached_path)
+            with open(os.path.splitext(cached_path)[0] + '.json', 'w', encoding='utf-8') as f:
+                json.dump({"frames": count, "first": os.path.basename(files[start]), "last": os.path.basename(files[end - 1])}, f)
+        elif cached_path is not None and os.path.exists(encode_path):
+            os.remove(encode_path)
+        return i, count
+
+    try:
+        concurrency = max(1, min(chunks, len(jobs)))
+        chunk_workers = max(1, workers // concurrency)
+        cached_frames = sum(ranges[i][1] - ranges[i][0] for i, count in enumerate(counts) if count is not None)
+        with tqdm(total=len(files), initial=cached_frames, desc="分段编码中", unit="帧", ncols=100, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]') as pbar, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for i, count in executor.map(run_job, jobs):
+                counts[i] = count
+
+        if any(count is None for count in counts):
+            print("\n🔴 错误: 部分分段编码失败，已放弃拼接。")
+            return 0
+
+        print(f"   - 正在以流复制方式拼接 {len(segment_paths)} 个分段...")
+        concat_start = time.perf_counter()
+        concatenated = concat_segments(segment_paths, output_video_path, segment_dir, overwrite=overwrite)
+        record_stage(profile, "concat", time.perf_counter() - concat_start, len(segment_paths))
+        if not concatenated:
+            return 0
+        return sum(counts)
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
 
 
 def create_video_from_images(
@@ -45,12 +1065,34 @@ def create_video_from_images(
     overwrite=False,
     mode='opencv',
     codec='h264',
+    workers=DEFAULT_READ_WORKERS,
+    prefetch=None,
+    encoder_options=None,
+    target_size='first',
+    probe_workers=DEFAULT_PROBE_WORKERS,
+    scan_workers=DEFAULT_SCAN_WORKERS,
+    chunks=1,
+    cache_dir=None,
+    bit_depth=8,
+    background=DEFAULT_BACKGROUND,
+    profile=False,
 ):
     """
     以专业的用户体验将图片序列转换为视频。
-    - 阶段1: 扫描、筛选并排序图片文件，确定视频参数。
+    - 阶段1: 扫描、筛选并排序图片文件，并行探测所有图片头，确定视频参数。
+      尺寸不符的图片会在编码前统一报告，视频尺寸按 target_size ('first' / 'most-common' / 'max') 选定。
     - 阶段2: 使用tqdm进度条进行视频编码，提供实时反馈。
+      OpenCV / FFmpeg 管道模式下图片由 workers 个线程预读解码 (最多提前 prefetch 张)，编码器按原顺序写入。
+    - encoder_options (预设、CRF/码率、线程、GOP、tune) 仅作用于 FFmpeg 的两种模式。
+    - chunks > 1 时将序列切分为与 GOP 对齐的分段并行编码，再以流复制方式无损拼接 (需要 ffmpeg)。
+    - cache_dir 启用分段缓存: 只重新编码文件列表、大小/修改时间或编码参数发生变化的分段。
+    - 由 Python 解码的模式 (opencv / ffmpeg-pipe) 会把 16 位、带 alpha (与 background 合成) 和灰度图片
+      统一归一化为 3 通道；bit_depth=10 时输出 yuv420p10le (仅 FFmpeg 模式)。
+    - profile 为真时记录扫描、排序、探测、解码、缩放、写入/编码各阶段的耗时与吞吐量，
+      并在输出视频旁写出 JSON 报告 (<输出文件名>.profile.json)。
     """
+    run_start = time.perf_counter()
+    stage_profile = new_profile() if profile else None
 
     # --- 阶段 0: 安全检查 ---
     if os.path.exists(output_video_path) and not overwrite:
@@ -61,29 +1103,11 @@ def create_video_from_images(
     # --- 阶段 1: 文件发现与参数计算 ---
     print("🔍 [阶段 1/2] 正在扫描目录、筛选并排序文件...")
 
-    files_to_process = []
-    if regex_pattern:
-        compiled_regex = re.compile(regex_pattern)
-
-    # 根据是否递归选择不同的文件搜集策略
     if recursive:
-        print("   - 启用递归扫描...")
-        for root, _, filenames in os.walk(input_dir):
-            for filename in filenames:
-                if regex_pattern and not compiled_regex.search(filename):
-                    continue
-                full_path = os.path.join(root, filename)
-                files_to_process.append(full_path)
-    else:
-        for filename in os.listdir(input_dir):
-            full_path = os.path.join(input_dir, filename)
-            if os.path.isfile(full_path):
-                if regex_pattern and not compiled_regex.search(filename):
-                    continue
-                files_to_process.append(full_path)
+        print(f"   - 启用递归扫描 ({scan_workers} 个扫描线程)...")
 
-    # --- 按文件名进行自然排序，这对于视频序列至关重要 ---
-    files_to_process.sort(key=lambda f: natural_sort_key(os.path.basename(f)))
+    # --- 扫描时即按正则筛选，并按文件名进行自然排序，这对于视频序列至关重要 ---
+    files_to_process = discover_files(input_dir, regex_pattern, recursive=recursive, workers=scan_workers, profile=stage_profile)
 
     if not files_to_process:
         print("\n⚠️ 未找到任何符合条件的文件。请检查您的输入目录、正则表达式和--recursive选项。")
@@ -91,14 +1115,39 @@ def create_video_from_images(
 
     print(f"✅ 找到 {len(files_to_process)} 张符合条件的图片。")
 
-    # --- 确定视频尺寸 ---
-    try:
-        with Image.open(files_to_process[0]) as img:
-            width, height = img.size
-        print(f"🖼️ 视频尺寸将设定为第一张图片的尺寸: {width}x{height}。")
-    except Exception as e:
-        print(f"\n🔴 错误: 无法读取第一张图片 '{files_to_process[0]}' 的尺寸: {e}")
+    # --- 并行探测所有图片头，确定视频尺寸 ---
+    probe_start = time.perf_counter()
+    image_table, probe_failures = probe_image_headers(files_to_process, workers=probe_workers)
+    record_stage(stage_profile, "probe", time.perf_counter() - probe_start, len(files_to_process))
+    if probe_failures:
+        print(f"🟡 警告: {len(probe_failures)} 个文件无法识别为图片，已从序列中移除:")
+        for image_path, e in probe_failures[:MISMATCH_REPORT_LIMIT]:
+            print(f"   - {os.path.basename(image_path)}: {e}")
+        if len(probe_failures) > MISMATCH_REPORT_LIMIT:
+            print(f"   - ... 以及其他 {len(probe_failures) - MISMATCH_REPORT_LIMIT} 个文件")
+    if not image_table:
+        print("\n🔴 错误: 没有任何可读取的图片。")
         return
+    files_to_process = [image_path for image_path, _, _, _, _ in image_table]
+    orientations = {image_path: orientation for image_path, _, _, _, orientation in image_table if orientation != 1}
+    if orientations:
+        print(f"   - {len(orientations)} 张图片带有 EXIF 方向信息，解码时将自动旋转 (尺寸按旋转后计算)。")
+
+    width, height = choose_target_size(image_table, target_size)
+    target_size_labels = {'first': '第一张图片', 'most-common': '最常见', 'max': '最大'}
+    print(f"🖼️ 视频尺寸将设定为{target_size_labels[target_size]}的尺寸: {width}x{height}。")
+
+    size_counts = Counter((w, h) for _, w, h, _, _ in image_table)
+    mode_counts = Counter(mode for _, _, _, mode, _ in image_table)
+    if len(mode_counts) > 1:
+        print(f"   - 颜色模式分布: {', '.join(f'{mode} x{count}' for mode, count in mode_counts.most_common())}")
+    mismatched = [(os.path.basename(p), w, h) for p, w, h, _, _ in image_table if (w, h) != (width, height)]
+    if mismatched:
+        print(f"🟡 警告: {len(mismatched)} 张图片的尺寸与视频尺寸不符，编码时将自动缩放。尺寸分布:")
+        for (w, h), count in size_counts.most_common():
+            print(f"   - {w}x{h}: {count} 张{' (目标尺寸)' if (w, h) == (width, height) else ''}")
+        examples = ', '.join(f"'{name}' ({w}x{h})" for name, w, h in mismatched[:MISMATCH_REPORT_LIMIT])
+        print(f"   - 示例: {examples}{' ...' if len(mismatched) > MISMATCH_REPORT_LIMIT else ''}")
 
     # --- 计算最终帧率 ---
     if duration:
@@ -120,52 +1169,76 @@ def create_video_from_images(
         os.makedirs(output_dir, exist_ok=True)
 
     print(f"\n🚀 [阶段 2/2] 开始使用 {mode.upper()} 将图片序列编码为视频...")
-    time.sleep(1)
+    if stage_profile is None:
+        time.sleep(1)
 
     processed_count = 0
 
-    if mode == 'ffmpeg':
-        if not shutil.which("ffmpeg"):
-            print("\n🔴 错误: 'ffmpeg' 命令未找到。")
-            print("请安装 FFmpeg 并确保它在系统的 PATH 环境变量中。")
+    if (mode in ('ffmpeg', 'ffmpeg-pipe') or chunks > 1 or cache_dir) and not shutil.which("ffmpeg"):
+        print("\n🔴 错误: 'ffmpeg' 命令未找到。")
+        print("请安装 FFmpeg 并确保它在系统的 PATH 环境变量中 (分段编码的拼接同样需要 FFmpeg)。")
+        return
+
+    if bit_depth != 8:
+        if mode == 'opencv':
+            print("\n🔴 错误: OpenCV 模式只支持 8 位输出，10 位输出请使用 --mode ffmpeg 或 ffmpeg-pipe。")
             return
+        print(f"   - 输出位深: {bit_depth} 位 ({BIT_DEPTH_PIX_FMTS[bit_depth]['output']})")
 
-        ffmpeg_codec_map = {
-            'h264': 'libx264',
-            'h265': 'libx265',
-            'av1': 'libaom-av1', # 需要 ffmpeg 编译时支持 libaom
-        }
-        video_codec = ffmpeg_codec_map.get(codec)
+    if mode in ('ffmpeg', 'ffmpeg-pipe') and encoder_options:
+        print(f"   - 编码参数: {' '.join(build_encoder_args(codec, encoder_options))}")
+    elif mode == 'opencv' and encoder_options:
+        print("   🟡 警告: OpenCV 模式不支持预设/CRF/码率等编码参数，这些设置将被忽略。")
+
+    if chunks > 1 or cache_dir:
+        if mode == 'opencv':
+            print(f"   - 编码器: {codec.upper()} (使用 OpenCV FourCC: '{OPENCV_FOURCC_MAP[codec]}')")
+        else:
+            print(f"   - 编码器: {codec.upper()} (使用 FFmpeg 的 '{FFMPEG_CODEC_MAP[codec]}')")
+        processed_count = encode_in_chunks(
+            files_to_process, output_video_path, mode, codec, (width, height), final_fps, chunks,
+            overwrite=overwrite, workers=workers, prefetch=prefetch, encoder_options=encoder_options,
+            cache_dir=cache_dir, bit_depth=bit_depth, background=background, profile=stage_profile,
+            orientations=orientations,
+        )
+
+    elif mode == 'ffmpeg-pipe':
+        print(f"   - 编码器: {codec.upper()} (使用 FFmpeg 的 '{FFMPEG_CODEC_MAP[codec]}'，经 stdin 传输 bgr24 原始帧)")
+        frame_items = (
+            (os.path.basename(image_path), frame, original_size, error)
+            for image_path, frame, original_size, error in iter_decoded_frames(
+                files_to_process, (width, height), workers=workers, prefetch=prefetch,
+                bit_depth=bit_depth, background=background, profile=stage_profile, orientations=orientations,
+            )
+        )
+        processed_count = pipe_frames_to_ffmpeg(
+            frame_items, len(files_to_process), (width, height), final_fps, output_video_path,
+            codec=codec, overwrite=overwrite, encoder_options=encoder_options,
+            input_pix_fmt=BIT_DEPTH_PIX_FMTS[bit_depth]["bgr"], output_pix_fmt=BIT_DEPTH_PIX_FMTS[bit_depth]["output"],
+            profile=stage_profile,
+        ) or 0
+
+    elif mode == 'ffmpeg':
+        video_codec = FFMPEG_CODEC_MAP.get(codec)
         print(f"   - 编码器: {codec.upper()} (使用 FFmpeg 的 '{video_codec}')")
 
         # 为 ffmpeg 创建一个临时的文件列表
         with tempfile.NamedTemporaryFile('w', delete=False, suffix='.txt', encoding='utf-8') as tmpfile:
-            for image_path in files_to_process:
-                tmpfile.write(f"file '{os.path.abspath(image_path)}'\n")
             temp_file_path = tmpfile.name
-        
+        write_concat_list(files_to_process, temp_file_path)
+
         print(f"   - 已为 FFmpeg 创建临时文件列表: {temp_file_path}")
 
         try:
             # 构建 ffmpeg 命令
-            cmd = [
-                'ffmpeg',
-                '-hide_banner',  # 隐藏版本信息
-                '-r', str(round(final_fps, 2)),
-                '-f', 'concat',
-                '-safe', '0',
-                '-i', temp_file_path,
-                '-c:v', video_codec,
-                '-pix_fmt', 'yuv420p', # 保证最佳兼容性
-            ]
-            if overwrite:
-                cmd.append('-y')
-            cmd.append(output_video_path)
+            cmd = build_ffmpeg_concat_command(temp_file_path, output_video_path, final_fps, codec, overwrite, encoder_options, bit_depth)
 
             print("   - 执行 FFmpeg 命令...")
             
             # 执行命令并等待完成
+            ffmpeg_start = time.perf_counter()
             result = subprocess.run(cmd, check=False, capture_output=True, text=True, encoding='utf-8')
+            record_stage(stage_profile, "ffmpeg", time.perf_counter() - ffmpeg_start, len(files_to_process))
 
             if result.returncode == 0:
                 print("   - FFmpeg 成功完成编码。")
@@ -191,12 +1264,7 @@ def create_video_from_images(
             print("OpenCV 模式需要此库，请通过 'pip install opencv-python-headless' 安装。")
             return
 
-        opencv_fourcc_map = {
-            'h264': 'avc1', # H.264
-            'h265': 'hvc1', # H.265
-            'av1': 'av01',  # AV1
-        }
-        fourcc_str = opencv_fourcc_map[codec]
+        fourcc_str = OPENCV_FOURCC_MAP[codec]
         print(f"   - 编码器: {codec.upper()} (使用 OpenCV FourCC: '{fourcc_str}')")
 
         # 检查容器和编码器的常见组合
@@ -214,25 +1282,11 @@ def create_video_from_images(
             return
 
         with tqdm(total=len(files_to_process), desc="视频编码中", unit="帧", ncols=100, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]') as pbar:
-            for image_path in files_to_process:
-                try:
-                    frame = cv2.imread(image_path)
-                    if frame is None:
-                        tqdm.write(f"🟡 警告: 无法读取图片 '{os.path.basename(image_path)}'，已跳过。")
-                        continue
-                    
-                    frame_h, frame_w, _ = frame.shape
-                    if (frame_w, frame_h) != (width, height):
-                        tqdm.write(f"🟡 警告: '{os.path.basename(image_path)}' 的尺寸 ({frame_w}x{frame_h}) 与视频尺寸 ({width}x{height}) 不符，将自动缩放。")
-                        frame = cv2.resize(frame, (width, height))
+            processed_count = write_frames_with_opencv(
+                video_writer, files_to_process, (width, height), pbar, workers=workers, prefetch=prefetch,
+                background=background, profile=stage_profile, orientations=orientations,
+            )
 
-                    video_writer.write(frame)
-                    processed_count += 1
-                except Exception as e:
-                    tqdm.write(f"🔴 错误: 处理 '{os.path.basename(image_path)}' 时发生错误: {e}")
-                finally:
-                    pbar.update(1)
-        
         video_writer.release()
 
     # --- 最终报告 ---
@@ -246,6 +1300,30 @@ def create_video_from_images(
         print("未能成功生成视频。请检查上面的错误信息。")
         print("----------------------")
 
+    if stage_profile is not None:
+        write_profile_report(
+            stage_profile,
+            os.path.splitext(output_video_path)[0] + PROFILE_REPORT_SUFFIX,
+            time.perf_counter() - run_start,
+            processed_count,
+            {
+                "input_dir": os.path.abspath(input_dir),
+                "output_video": os.path.abspath(output_video_path),
+                "mode": mode,
+                "codec": codec,
+                "size": [width, height],
+                "fps": final_fps,
+                "workers": workers,
+                "prefetch": prefetch,
+                "probe_workers": probe_workers,
+                "scan_workers": scan_workers,
+                "chunks": chunks,
+                "cache_dir": cache_dir,
+                "bit_depth": bit_depth,
+                "encoder_options": encoder_options or {},
+            },
+        )
+
 
 def main():
     """主函数，用于解析命令行参数。"""
@@ -255,15 +1333,22 @@ def main():
     )
 
     # --- 位置参数 ---
-    parser.add_argument("input_dir", help="包含有序图片序列的输入目录。" )
+    parser.add_argument("input_dir", help="""
+包含有序图片序列的输入目录；也可以是一个 .npy 帧数组文件
+(例如 video_to_images.py --output-mode npy 生成的 frames.npy，默认按 RGB 解释)。
+.npy 输入直接以像素流编码，只支持 --mode opencv / ffmpeg，不支持文件发现、读图与分段相关的选项
+(--regex、--recursive、--target-size、--workers、--prefetch、--chunks、--cache-dir、
+--scan-workers、--probe-workers、--profile)。""")
     parser.add_argument("output_video", help="输出视频文件的完整路径 (例如: 'output/my_video.mp4')。")
 
     # --- 编码与行为选项 ---
     option_group = parser.add_argument_group("编码与行为选项")
-    option_group.add_argument("--mode", type=str, default="opencv", choices=["opencv", "ffmpeg"], help="""
+    option_group.add_argument("--mode", type=str, default="opencv", choices=["opencv", "ffmpeg", "ffmpeg-pipe"], help="""
 【可选】选择视频编码后端。
 'opencv': 使用 OpenCV 库，提供详细的进度条。
-'ffmpeg': 使用外部 FFmpeg 程序，可能性能更高，需要手动安装。
+'ffmpeg': 使用外部 FFmpeg 程序，通过 concat 文件列表读取图片，需要手动安装。
+'ffmpeg-pipe': 由 Python 并行解码图片，以原始像素流经 stdin 送入 FFmpeg，
+               省去 FFmpeg 逐个打开/探测文件的开销，并提供实时进度条。
 (默认: 'opencv')""")
     option_group.add_argument("--codec", type=str, default="h264", choices=["h264", "h265", "av1"], help="""
 【可选】指定视频编码器。
@@ -279,6 +1364,72 @@ def main():
   - 只处理名为 'frame_数字.jpg' 的文件: '^frame_\d+\.jpg$'""")
     option_group.add_argument("--recursive", "-R", action="store_true", help="【可选】递归地在输入目录的所有子目录中搜索图片。" )
     option_group.add_argument("--overwrite", "-f", "--force", action="store_true", help="【可选】如果输出视频文件已存在，则强制覆盖它。" )
+    option_group.add_argument("--channel-order", type=str, default=None, choices=["rgb", "bgr"], help=f"""
+【可选】输入为 .npy 帧数组时的通道顺序 (默认: '{NPY_DEFAULT_CHANNEL_ORDER}'，与 video_to_images.py 的 npy 输出一致)。""")
+    option_group.add_argument("--bit-depth", type=int, default=8, choices=[8, 10], help="""
+【可选】输出视频的位深 (默认: 8)。
+10: 以 16 位像素流送入 FFmpeg 并编码为 yuv420p10le，保留 16 位 PNG 的渐变精度，
+    仅支持 --mode ffmpeg / ffmpeg-pipe (H.265 / AV1 支持最好，H.264 需要 High 10 版本的 libx264)。""")
+    option_group.add_argument("--background", type=str, default=",".join(str(v) for v in reversed(DEFAULT_BACKGROUND)), help="""
+【可选】带透明通道的图片与之合成的背景色，格式为 'R,G,B' (0~255，默认: '0,0,0' 黑色)。
+仅作用于由 Python 解码图片的模式 (opencv / ffmpeg-pipe)。""")
+    option_group.add_argument("--target-size", type=str, default="first", choices=["first", "most-common", "max"], help="""
+【可选】当图片尺寸不一致时，选择视频尺寸的策略。
+'first':       使用第一张图片的尺寸。
+'most-common': 使用出现次数最多的尺寸，需要缩放的图片最少。
+'max':         使用面积最大的尺寸，避免丢失细节。
+(默认: 'first')""")
+
+    # --- 编码器调优选项 (仅 FFmpeg 模式) ---
+    tuning_group = parser.add_argument_group("编码器调优选项 (仅 --mode ffmpeg / ffmpeg-pipe)")
+    tuning_group.add_argument("--encode-profile", type=str, default=None, choices=list(ENCODE_PROFILES), help="""
+【可选】命名的速度/质量档位，同时设定预设与 CRF (按编码器取值)。
+'fast':     veryfast 预设，CRF h264=26 / h265=30 / av1=38。
+'balanced': medium 预设，CRF h264=23 / h265=28 / av1=32。
+'quality':  slow 预设，CRF h264=18 / h265=22 / av1=24。
+显式指定的 --preset / --crf / --bitrate 会覆盖档位中的对应值。""")
+    tuning_group.add_argument("--preset", type=str, default=None, choices=ENCODER_PRESETS, help="""
+【可选】编码速度预设 (ultrafast ... veryslow)。
+对 AV1 (libaom) 自动映射为 -cpu-used 0~8，例如 'veryfast' -> 7，'medium' -> 4。
+libaom 默认设置非常慢，选择较快的预设可大幅缩短编码时间。""")
+    rate_group = tuning_group.add_mutually_exclusive_group()
+    rate_group.add_argument("--crf", type=int, default=None, help="""
+【可选】恒定质量因子，数值越小画质越高、文件越大。
+参考范围: h264 18~28，h265 22~32，av1 24~40。""")
+    rate_group.add_argument("--bitrate", type=str, default=None, help="【可选】目标码率，例如 '4M' 或 '2500k'。与 --crf 互斥。")
+    tuning_group.add_argument("--threads", type=int, default=None, help="【可选】编码器使用的线程数 (默认: 由 FFmpeg 自动决定)。")
+    tuning_group.add_argument("--gop", type=int, default=None, help="【可选】关键帧间隔 (帧数)，即 GOP 长度。")
+    tuning_group.add_argument("--tune", type=str, default=None, help="""
+【可选】编码器的 tune 参数，例如:
+  - h264: film, animation, grain, stillimage, fastdecode, zerolatency
+  - h265: grain, animation, fastdecode, zerolatency
+  - av1:  psnr, ssim""")
+
+    # --- 性能选项 ---
+    performance_group = parser.add_argument_group("性能选项")
+    performance_group.add_argument("--workers", type=int, default=DEFAULT_READ_WORKERS, help=f"""
+【可选】OpenCV / FFmpeg 管道模式下用于预读、解码与缩放图片的线程数 (默认: {DEFAULT_READ_WORKERS})。""")
+    performance_group.add_argument("--chunks", type=int, default=1, help=f"""
+【可选】分段并行编码的段数 (默认: 1，即不分段)。
+排序后的图片序列被切分为与 GOP 对齐的连续分段 (GOP 取 --gop，默认 {DEFAULT_CHUNK_GOP})，
+由多个编码器实例同时编码，再通过 FFmpeg concat 分离器以 -c copy 无损拼接。
+适合单个编码器无法占满 CPU 的场景 (如慢预设下的 AV1/H.265)。需要安装 FFmpeg。""")
+    performance_group.add_argument("--cache-dir", type=str, default=None, help=f"""
+【可选】分段编码缓存目录。序列按 {CACHE_SEGMENT_GOPS} 个 GOP 切分为固定长度的分段，
+每段的编码结果以 (文件列表、大小、修改时间、编码参数) 的哈希为键保存在该目录中。
+再次运行时只重新编码发生变化的分段，其余分段直接以流复制方式拼接。
+可与 --chunks 组合，同时编码多个变化的分段。缓存不会自动清理。需要安装 FFmpeg。""")
+    performance_group.add_argument("--scan-workers", type=int, default=DEFAULT_SCAN_WORKERS, help=f"""
+【可选】递归扫描时并行遍历子目录的线程数 (默认: {DEFAULT_SCAN_WORKERS})。设为 1 则顺序扫描。""")
+    performance_group.add_argument("--probe-workers", type=int, default=DEFAULT_PROBE_WORKERS, help=f"""
+【可选】并行读取图片文件头 (尺寸与颜色模式) 的线程数 (默认: {DEFAULT_PROBE_WORKERS})。""")
+    performance_group.add_argument("--profile", action="store_true", help=f"""
+【可选】记录各阶段 (扫描、排序、探测、解码、缩放、归一化、写入/编码、拼接) 的耗时、次数、帧/s 与 MB/s，
+结束时打印汇总表，并在输出视频旁写出 JSON 报告 (<输出文件名>{PROFILE_REPORT_SUFFIX})。
+用于判断瓶颈在读盘、解码还是编码，从而调整 --workers / --chunks 等参数。""")
+    performance_group.add_argument("--prefetch", type=int, default=None, help="""
+【可选】最多提前解码的图片张数 (默认: 线程数 x 2)。
+解码结果按原顺序交给编码器，该值限制了重排缓冲区占用的内存。""")
 
     # --- 帧率控制参数 (互斥) ---
     duration_group = parser.add_mutually_exclusive_group(required=True)
@@ -287,9 +1438,44 @@ def main():
 
     args = parser.parse_args()
 
+    if args.input_dir.lower().endswith('.npy'):
+        # .npy 帧数组不经过文件发现、读图与分段流程，这些选项不会生效，直接报错而不是静默忽略
+        if args.mode == 'ffmpeg-pipe':
+            parser.error("输入为 .npy 帧数组时不支持 --mode ffmpeg-pipe (帧数组本身即以像素流送入 FFmpeg)，请使用 --mode ffmpeg。")
+        ignored = [
+            flag for flag, dest in (
+                ("--regex", "regex"), ("--recursive", "recursive"), ("--target-size", "target_size"),
+                ("--workers", "workers"), ("--prefetch", "prefetch"), ("--chunks", "chunks"),
+                ("--cache-dir", "cache_dir"), ("--scan-workers", "scan_workers"),
+                ("--probe-workers", "probe_workers"), ("--profile", "profile"),
+            )
+            if getattr(args, dest) != parser.get_default(dest)
+        ]
+        if ignored:
+            parser.error(f"输入为 .npy 帧数组时不支持以下选项: {', '.join(ignored)}")
+
+    try:
+        red, green, blue = (int(v) for v in args.background.split(","))
+        if not all(0 <= v <= 255 for v in (red, green, blue)):
+            raise ValueError
+        background = (blue, green, red)
+    except ValueError:
+        parser.error(f"--background 的格式应为 'R,G,B' (0~255)，当前为: '{args.background}'")
+
+    encoder_options = resolve_encoder_options(
+        args.codec,
+        profile=args.encode_profile,
+        preset=args.preset,
+        crf=args.crf,
+        bitrate=args.bitrate,
+        threads=args.threads,
+        gop=args.gop,
+        tune=args.tune,
+    )
+
     # --- 配置信息打印 ---
     print("\n--- 🛠️ 配置信息 ---")
-    print(f"➡️ 输入目录: {args.input_dir}")
+    print(f"➡️ 输入{'帧数组' if args.input_dir.lower().endswith('.npy') else '目录'}: {args.input_dir}")
     print(f"⬅️ 输出视频: {args.output_video}")
     print(f"⚙️ 编码后端: {args.mode.upper()}")
     print(f"📹 视频编码器: {args.codec.upper()}")
@@ -300,8 +1486,46 @@ def main():
         print(f"⏱️ 帧率模式: 固定总时长 ({args.duration}s)")
     print(f"🔄 递归搜索: {'启用' if args.recursive else '禁用'}")
     print(f"💥 强制覆盖: {'启用' if args.overwrite else '禁用'}")
+    print(f"📐 视频尺寸策略: {args.target_size}")
+    print(f"🎨 输出位深: {args.bit_depth} 位, 透明背景色: RGB({args.background})")
+    print(f"🧵 读图线程: {args.workers}")
+    if args.chunks > 1:
+        print(f"🧩 分段并行编码: {args.chunks} 段")
+    if args.cache_dir:
+        print(f"🗄️ 分段缓存目录: {args.cache_dir}")
+    if encoder_options:
+        print(f"🎚️ 编码调优: {'档位 ' + args.encode_profile + ', ' if args.encode_profile else ''}"
+              f"{', '.join(f'{key}={value}' for key, value in encoder_options.items())}")
     print("----------------------\n")
 
+    if os.path.isfile(args.input_dir) and args.input_dir.lower().endswith('.npy'):
+        # --- 帧来源: .npy 帧数组 (内存映射读取，不经过图片文件) ---
+        print(f"🚀 正在将帧数组 '{args.input_dir}' 编码为视频...")
+        processed_count = encode_frames(
+            args.input_dir,
+            args.output_video,
+            fps=args.fps,
+            duration=args.duration,
+            mode=args.mode,
+            codec=args.codec,
+            overwrite=args.overwrite,
+            encoder_options=encoder_options,
+            channel_order=args.channel_order,
+            bit_depth=args.bit_depth,
+            background=background,
+        )
+        if processed_count:
+            print("\n--- ✨ 处理报告 ✨ ---")
+            print(f"✔️ 成功处理: {processed_count} 帧")
+            print(f"🎬 视频文件已保存至: {os.path.abspath(args.output_video)}")
+            print("----------------------")
+        else:
+            print("\n--- ❌ 处理失败 ---")
+            print("未能成功生成视频。请检查上面的错误信息。")
+            print("----------------------")
+        print("\n🎉 所有任务已完成！")
+        return
+
     create_video_from_images(
         args.input_dir,
         args.output_video,
@@ -312,6 +1536,17 @@ def main():
         overwrite=args.overwrite,
         mode=args.mode,
         codec=args.codec,
+        workers=args.workers,
+        prefetch=args.prefetch,
+        encoder_options=encoder_options,
+        target_size=args.target_size,
+        probe_workers=args.probe_workers,
+        scan_workers=args.scan_workers,
+        chunks=args.chunks,
+        cache_dir=args.cache_dir,
+        bit_depth=args.bit_depth,
+        background=background,
+        profile=args.profile,
     )
 
     print("\n🎉 所有任务已完成！")
@@ -7,8 +7,15 @@
 # ///
 import os
 import re
+import json
+import hashlib
 import argparse
 import time
+import shutil
+import itertools
+import multiprocessing
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from PIL import Image
 
 # 尝试导入tqdm，如果失败则提供安装指导
@@ -19,84 +26,505 @@ except ImportError:
     print("请通过命令 'pip install tqdm' 来安装它，以启用进度条功能。")
     exit()
 
-def resize_images_professional(input_dir, output_dir, scale_factor, regex_pattern=None):
+
+# --- 文件发现 ---
+# 自然排序的分段正则，预编译一次，避免为每个文件名重新解析。
+NATURAL_SORT_PATTERN = re.compile(r'([0-9]+)')
+# 并行扫描子目录的默认线程数 (对 NFS 等高延迟文件系统效果明显)
+DEFAULT_SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+# --- 多进程缩放 ---
+# 每个进程平均分到约 CHUNKS_PER_WORKER 批任务: 批次越大 IPC 开销越小，批次越小负载越均衡、进度条越平滑
+CHUNKS_PER_WORKER = 4
+# 单批任务数的上限，避免大数据集时进度条长时间不动
+MAX_CHUNKSIZE = 64
+
+# --- 缩小时的快速解码 ---
+# 与 Image.thumbnail 的默认值一致: JPEG 先在 DCT 域以 1/2、1/4、1/8 解码到不小于目标尺寸 2 倍的大小，
+# 其他格式先用 Image.reduce 做整数倍缩小，最后一步仍为 LANCZOS，画质与全尺寸缩放几乎无差别。
+DEFAULT_REDUCING_GAP = 2.0
+
+# --- 增量模式 (--incremental) ---
+# 索引文件保存在输出目录下，记录每个输入文件的 (大小, 修改时间, 缩放参数) 与输出文件的 (大小, 修改时间, SHA-1)
+INDEX_FILENAME = ".resize_index.json"
+# 索引格式或输出算法变化时递增，使旧索引全部失效
+INDEX_VERSION = 1
+
+# --- 多分辨率金字塔 (--scales) ---
+# 各层输出到 <输出目录>/images_<缩小倍数>，与 COLMAP / 3DGS 的 images_2、images_4、images_8 约定一致
+PYRAMID_DIR_PREFIX = "images_"
+
+# --- 目标尺寸模式 (--max-side / --width / --height) ---
+# contain: 完整放入目标框 (保持比例，不裁剪)；cover: 铺满目标框后居中裁剪到目标尺寸
+FIT_MODES = ('contain', 'cover')
+
+
+def natural_sort_key(s):
+    """为字符串提供自然排序的键，例如 'img10.jpg' 会在 'img2.jpg' 之后。"""
+    return [int(text) if text.isdigit() else text.lower() for text in NATURAL_SORT_PATTERN.split(s)]
+
+
+def scan_directory(directory, compiled_regex=None, recursive=False):
+    """
+    使用 os.scandir 扫描单个目录，直接复用 DirEntry 缓存的类型信息，不再逐个调用 os.path.isfile。
+    返回 (文件列表, 子目录列表)，文件列表中每项为 (自然排序键, 完整路径)。
+    - 正则在扫描时立即过滤，排序键只为通过筛选的文件计算一次。
+    - 与 os.walk 一致：不进入指向目录的符号链接，无权限的目录被静默跳过。
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if recursive and not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if compiled_regex is not None and not compiled_regex.search(entry.name):
+                    continue
+                files.append((natural_sort_key(entry.name), entry.path))
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def discover_files(input_dir, regex_pattern=None, recursive=False, workers=DEFAULT_SCAN_WORKERS):
+    """
+    发现并按文件名自然排序所有符合条件的文件，返回完整路径列表。
+    - recursive 为真时，子目录在 workers 个线程中并行扫描 (workers <= 1 时顺序扫描)。
+    - 排序只比较预先计算好的键；文件名相同时按完整路径排序，保证结果与扫描顺序无关。
+    """
+    compiled_regex = re.compile(regex_pattern) if regex_pattern else None
+    keyed_files = []
+
+    if not recursive or workers <= 1:
+        pending = [input_dir]
+        while pending:
+            files, subdirs = scan_directory(pending.pop(), compiled_regex, recursive)
+            keyed_files.extend(files)
+            pending.extend(subdirs)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(scan_directory, input_dir, compiled_regex, recursive)}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    keyed_files.extend(files)
+                    for subdir in subdirs:
+                        futures.add(executor.submit(scan_directory, subdir, compiled_regex, recursive))
+
+    keyed_files.sort()
+    return [path for _, path in keyed_files]
+
+
+def scale_image(img, new_size, reducing_gap=DEFAULT_REDUCING_GAP):
+    """
+    将刚打开 (尚未解码像素) 的图片缩放到 new_size，返回新的 Image。
+    - 缩小且 reducing_gap 为正时: JPEG 通过 draft() 让解码器直接输出缩小的图像，
+      其他格式由 resize(reducing_gap=...) 先做 Image.reduce 整数倍缩小，再以 LANCZOS 完成剩余部分。
+    - 放大或 reducing_gap 为 0/None 时: 全尺寸解码后直接 LANCZOS 缩放 (与旧版输出完全一致)。
+    """
+    if not reducing_gap or new_size[0] >= img.width or new_size[1] >= img.height:
+        return img.resize(new_size, Image.Resampling.LANCZOS)
+
+    box = None
+    if img.format == 'JPEG':
+        # draft 会改变 img.size，返回的 box 是原图区域在缩小后图像中的坐标
+        result = img.draft(None, (int(new_size[0] * reducing_gap), int(new_size[1] * reducing_gap)))
+        if result is not None:
+            box = result[1]
+    return img.resize(new_size, Image.Resampling.LANCZOS, box=box, reducing_gap=reducing_gap)
+
+
+def file_signature(path):
+    """返回文件的 (大小, 纳秒级修改时间)；文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def load_index(output_dir):
+    """读取输出目录中的增量索引，返回 {相对路径: 记录}；索引不存在、损坏或版本不符时返回空字典。"""
+    index_path = os.path.join(output_dir, INDEX_FILENAME)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index.get("files", {})
+
+
+def save_index(output_dir, entries):
+    """原子地写出增量索引 (先写临时文件再替换)，中断时不会留下半截的索引。"""
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, INDEX_FILENAME)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({"version": INDEX_VERSION, "files": entries}, f, ensure_ascii=False)
+    os.replace(index_path + '.tmp', index_path)
+
+
+def output_path_for(input_path, input_dir, output_dir):
+    """输入文件在输出目录中对应的路径 (保持相对目录结构)。"""
+    return os.path.join(output_dir, os.path.relpath(input_path, input_dir))
+
+
+def is_up_to_date(entry, input_signature, params, output_path):
+    """
+    只凭 stat 与索引判断某个文件能否跳过，不解码图片:
+    输入的大小/修改时间与缩放参数均与记录一致，输出文件仍是上次写出的那个 (大小/修改时间一致) 且不早于输入。
+    """
+    if entry is None or input_signature is None:
+        return False
+    if (entry["size"], entry["mtime_ns"]) != input_signature or entry["params"] != params:
+        return False
+    output_signature = file_signature(output_path)
+    if output_signature is None:
+        return False
+    output = entry["output"]
+    return output_signature == (output["size"], output["mtime_ns"]) and output_signature[1] >= input_signature[1]
+
+
+def plan_incremental(files, input_dir, levels, indexes, workers=DEFAULT_SCAN_WORKERS):
+    """
+    对照各层输出目录的索引筛选出需要处理的文件，返回 (待处理文件列表, 未变化的文件数)。
+    - 只有所有层的输出都是最新的文件才会被跳过；任一层过期时整张图片重新处理 (解码只有一次)。
+    - 输入与输出文件的 stat 在 workers 个线程中并行执行 (对 NFS 等高延迟文件系统效果明显)。
+    """
+    def check(input_path):
+        relative_path = os.path.relpath(input_path, input_dir)
+        input_signature = file_signature(input_path)
+        return all(
+            is_up_to_date(index.get(relative_path), input_signature, level["params"], output_path_for(input_path, input_dir, level["output_dir"]))
+            for level, index in zip(levels, indexes)
+        )
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            unchanged = list(executor.map(check, files))
+    else:
+        unchanged = [check(path) for path in files]
+    pending = [path for path, skip in zip(files, unchanged) if not skip]
+    return pending, len(files) - len(pending)
+
+
+def build_index_entry(input_signature, params, output_path):
+    """为刚写出的输出文件生成索引记录 (输出的 SHA-1 只计算一次，此时文件仍在页缓存中)。"""
+    with open(output_path, 'rb') as f:
+        digest = hashlib.file_digest(f, 'sha1').hexdigest()
+    output_size, output_mtime_ns = file_signature(output_path)
+    return {
+        "size": input_signature[0],
+        "mtime_ns": input_signature[1],
+        "params": params,
+        "output": {"size": output_size, "mtime_ns": output_mtime_ns, "sha1": digest},
+    }
+
+
+def pyramid_dir_name(scale):
+    """金字塔层的目录名: 0.25 -> 'images_4'；倒数不是整数时使用比例本身，例如 0.75 -> 'images_0.75'。"""
+    factor = 1 / scale
+    if abs(factor - round(factor)) < 1e-6:
+        return f"{PYRAMID_DIR_PREFIX}{round(factor)}"
+    return f"{PYRAMID_DIR_PREFIX}{scale:g}"
+
+
+def build_levels(output_dir, scale_factor=None, scales=None, reducing_gap=DEFAULT_REDUCING_GAP, target=None):
+    """
+    生成输出层列表，每层为 {"scale" 或 "target", "output_dir", "params"}，params 写入增量索引。
+    - 给出 target ({"max_side", "width", "height", "fit"}) 时只有一层，每张图片的尺寸由 compute_target 按原图尺寸决定。
+    - 只给出 scale_factor 时只有一层，直接写入 output_dir。
+    - 给出 scales 时按比例从大到小排列，每层写入 output_dir/images_<倍数>；
+      除第一层外，每层都由上一层缩放得到，因此 params 中额外记录来源层的比例 ("from")。
+    """
+    if target:
+        return [{"target": target, "output_dir": output_dir, "params": {"target": target, "reducing_gap": reducing_gap or 0}}]
+    if not scales:
+        return [{"scale": scale_factor, "output_dir": output_dir, "params": {"scale": scale_factor, "reducing_gap": reducing_gap or 0}}]
+
+    levels = []
+    previous = None
+    for scale in sorted(set(scales), reverse=True):
+        params = {"scale": scale, "reducing_gap": reducing_gap or 0}
+        if previous is not None:
+            params["from"] = previous
+        levels.append({"scale": scale, "output_dir": os.path.join(output_dir, pyramid_dir_name(scale)), "params": params})
+        previous = scale
+    return levels
+
+
+def compute_target(size, level):
+    """
+    由原图尺寸计算某一层的输出，返回 (缩放后尺寸, 裁剪框或 None)；图片无需任何改动时返回 None。
+    - 比例模式 (level["scale"]): 总是按比例缩放 (与旧版一致，比例为 1 时也会重新编码)。
+    - 目标尺寸模式 (level["target"]): 只缩小不放大，已不大于目标尺寸的图片返回 None。
+      cover 先缩放到铺满 width x height 的目标框，再以缩放后图像中的居中裁剪框裁到目标尺寸。
+    """
+    width, height = size
+    if "scale" in level:
+        return (round(width * level["scale"]), round(height * level["scale"])), None
+
+    target = level["target"]
+    if target["max_side"]:
+        scale = target["max_side"] / max(width, height)
+    elif target["width"] and target["height"]:
+        ratios = (target["width"] / width, target["height"] / height)
+        scale = max(ratios) if target["fit"] == 'cover' else min(ratios)
+    elif target["width"]:
+        scale = target["width"] / width
+    else:
+        scale = target["height"] / height
+    scale = min(1.0, scale)
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    crop = None
+    if target["fit"] == 'cover' and target["width"] and target["height"]:
+        crop_width, crop_height = min(target["width"], new_size[0]), min(target["height"], new_size[1])
+        if (crop_width, crop_height) != new_size:
+            left = (new_size[0] - crop_width) // 2
+            top = (new_size[1] - crop_height) // 2
+            crop = (left, top, left + crop_width, top + crop_height)
+
+    if new_size == (width, height) and crop is None:
+        return None
+    return new_size, crop
+
+
+def probe_image_size(path):
+    """只读取图片头获取 (宽, 高)，不解码像素；无法识别时返回 None。"""
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def plan_targets(files, level, workers=DEFAULT_SCAN_WORKERS):
+    """
+    目标尺寸模式的规划阶段: 在 workers 个线程中并行读取所有图片头，返回 (需要缩放的文件, 无需改动的文件)。
+    无法读取图片头的文件归入需要缩放的一组，由处理阶段照常报告警告或错误。
+    """
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            sizes = list(executor.map(probe_image_size, files))
+    else:
+        sizes = [probe_image_size(path) for path in files]
+
+    to_resize = []
+    unchanged = []
+    for path, size in zip(files, sizes):
+        if size is not None and compute_target(size, level) is None:
+            unchanged.append(path)
+        else:
+            to_resize.append(path)
+    return to_resize, unchanged
+
+
+def place_unchanged(input_path, output_path, link=False):
+    """
+    把无需改动的图片原样放到输出位置，不重新编码。
+    link 为真时优先创建硬链接 (跨文件系统等失败时退回复制)；复制保留修改时间，增量模式的 "输出不早于输入" 判断依然成立。
+    """
+    same_file = os.path.exists(output_path) and os.path.samefile(input_path, output_path)
+    if link:
+        if same_file:
+            return
+        try:
+            if os.path.lexists(output_path):
+                os.remove(output_path)
+            os.link(input_path, output_path)
+            return
+        except OSError:
+            pass
+    if same_file:
+        # 上次以 --link 运行留下的硬链接: 先删除再复制，得到独立的副本 (否则 copy2 会抛出 SameFileError)
+        os.remove(output_path)
+    shutil.copy2(input_path, output_path)
+
+
+def resize_one_image(input_path, input_dir, levels, reducing_gap=DEFAULT_REDUCING_GAP, incremental=False, link=False):
+    """
+    缩放单张图片并写入每一层输出目录中对应的相对路径 (可在工作进程中直接执行)。
+    返回 (状态, 文件名, 消息, 索引记录列表)，状态为 'ok' / 'copied' / 'skipped' / 'error'。
+    - 图片只解码一次: 第一层由原图缩放 (可走 draft/reduce 快速解码)，之后每层由上一层的结果继续缩小。
+      各层尺寸都按原图尺寸乘以该层比例计算，与单独运行 --scale 时一致。
+    - 目标尺寸模式下已不大于目标尺寸的图片只读取图片头，然后直接复制或硬链接 (状态为 'copied')。
+    - incremental 为真时，成功后索引记录列表为每层的 (相对路径, 记录)，否则为空列表。
+    """
+    filename = os.path.basename(input_path)
+    # 在读取前记录输入的 stat，处理期间被修改的文件下次会被重新处理
+    input_signature = file_signature(input_path) if incremental else None
+    try:
+        # 从完整的输入路径推导出各层的输出路径
+        relative_path = os.path.relpath(input_path, input_dir)
+        output_paths = [output_path_for(input_path, input_dir, level["output_dir"]) for level in levels]
+        for output_path in output_paths:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # --- 核心图片处理逻辑 ---
+        with Image.open(input_path) as img:
+            if img.format is None:
+                return 'skipped', filename, f"🟡 警告: '{filename}' 不是有效图片格式，已跳过。", []
+
+            # 第一层的 scale_image 可能对 JPEG 调用 draft()，它会就地缩小 img.size，因此先记录原图尺寸
+            source_size = img.size
+            status = 'ok'
+            source = img
+            for level, output_path in zip(levels, output_paths):
+                planned = compute_target(source_size, level)
+                if planned is None:
+                    place_unchanged(input_path, output_path, link)
+                    status = 'copied'
+                    continue
+
+                new_size, crop = planned
+                if source.size != new_size:
+                    source = scale_image(source, new_size, reducing_gap)
+                if crop is not None:
+                    source = source.crop(crop)
+                source.save(output_path)
+
+        records = []
+        if incremental and input_signature is not None:
+            records = [(relative_path, build_index_entry(input_signature, level["params"], output_path)) for level, output_path in zip(levels, output_paths)]
+        return status, filename, None, records
+    except Exception as e:
+        return 'error', filename, f"🔴 错误: 处理 '{filename}' 时发生错误: {e}", []
+
+
+def compute_chunksize(total, workers):
+    """按文件数与进程数计算每批分发给工作进程的任务数。"""
+    return max(1, min(MAX_CHUNKSIZE, total // (workers * CHUNKS_PER_WORKER)))
+
+
+def resize_images_professional(input_dir, output_dir, scale_factor, regex_pattern=None, scan_workers=DEFAULT_SCAN_WORKERS, workers=1, reducing_gap=DEFAULT_REDUCING_GAP, incremental=False, scales=None, target=None, link=False):
     """
     以专业的用户体验处理图片缩放任务。
     - 阶段1: 快速扫描并建立待处理文件列表。
     - 阶段2: 使用tqdm进度条进行图片处理，提供实时反馈和ETA。
+      workers > 1 时文件按批分发到进程池，各进程直接写入输出目录，结果与错误汇总回主进程。
+    - incremental 为真时，按输出目录中的索引跳过输入与缩放参数均未变化、且输出仍然有效的文件 (只需 stat，不解码)，
+      处理结束 (包括中断) 时把新记录合并写回索引。
+    - 给出 scales 时输出多分辨率金字塔 (忽略 scale_factor): 每张图片只解码一次，逐层缩小后写入 images_<倍数> 子目录，
+      每层目录各自维护增量索引。
+    - 给出 target 时按目标尺寸缩放 (忽略 scale_factor): 先只读图片头规划，已不大于目标尺寸的图片
+      在线程池中直接复制 (link 为真时硬链接)，只有真正需要缩放的图片才交给进程池解码。
     """
+    levels = build_levels(output_dir, scale_factor, scales, reducing_gap, target)
 
     # --- 阶段 1: 文件发现与筛选 ---
     print("🔍 [阶段 1/2] 正在扫描目录并筛选文件...")
 
-    files_to_process = []
-    if regex_pattern:
-        compiled_regex = re.compile(regex_pattern)
-
-    for root, _, filenames in os.walk(input_dir):
-        for filename in filenames:
-            # 如果提供了正则表达式，则进行匹配
-            if regex_pattern:
-                if not compiled_regex.search(filename):
-                    continue  # 不匹配则跳过
-
-            # 将符合条件的文件的完整路径添加到列表
-            files_to_process.append(os.path.join(root, filename))
+    # 递归扫描所有子目录，扫描时即按正则筛选 (不匹配的文件不会进入列表)
+    files_to_process = discover_files(input_dir, regex_pattern, recursive=True, workers=scan_workers)
 
     if not files_to_process:
         print("\n⚠️ 未找到任何符合条件的文件。请检查您的输入目录和正则表达式。")
         return
 
     print(f"✅ 找到 {len(files_to_process)} 个待处理的文件。")
+
+    indexes = None
+    unchanged_count = 0
+    if incremental:
+        indexes = [load_index(level["output_dir"]) for level in levels]
+        files_to_process, unchanged_count = plan_incremental(files_to_process, input_dir, levels, indexes, workers=scan_workers)
+        print(f"♻️ 增量模式: {unchanged_count} 个文件未变化，已跳过；需要处理 {len(files_to_process)} 个 (索引中共 {min(len(index) for index in indexes)} 条记录)。")
+        if not files_to_process:
+            print("\n--- ✨ 处理报告 ✨ ---")
+            print(f"♻️ 未变化而跳过: {unchanged_count} 张图片")
+            print(f"📂 所有文件均已是最新: {os.path.abspath(output_dir)}")
+            print("----------------------")
+            return
+
+    files_to_copy = []
+    if target:
+        # 只读图片头: 已不大于目标尺寸的图片无需解码，直接复制或硬链接
+        files_to_process, files_to_copy = plan_targets(files_to_process, levels[0], workers=scan_workers)
+        print(f"📐 图片头规划: {len(files_to_process)} 个需要缩放，{len(files_to_copy)} 个已不大于目标尺寸 (将{'硬链接' if link else '复制'})。")
+
     print("\n🚀 [阶段 2/2] 开始处理图片...")
     time.sleep(1) # 短暂暂停，让用户看清信息
 
     # --- 阶段 2: 图片处理（带tqdm进度条） ---
     processed_count = 0
+    copied_count = 0
     skipped_count = 0
+    task = partial(resize_one_image, input_dir=input_dir, levels=levels, reducing_gap=reducing_gap, incremental=incremental, link=link)
+    new_entries = [{} for _ in levels]
 
-    # 使用tqdm包装文件列表，自动生成进度条
-    with tqdm(total=len(files_to_process), desc="调整图片尺寸", unit="张", ncols=100, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]') as pbar:
-        for input_path in files_to_process:
-            try:
-                # 从完整的输入路径推导出输出路径
-                relative_path = os.path.relpath(os.path.dirname(input_path), input_dir)
-                filename = os.path.basename(input_path)
-
-                current_output_dir = os.path.join(output_dir, relative_path)
-                os.makedirs(current_output_dir, exist_ok=True)
-                output_path = os.path.join(current_output_dir, filename)
-
-                # --- 核心图片处理逻辑 ---
-                with Image.open(input_path) as img:
-                    if img.format is None:
-                        # 使用tqdm.write打印，避免弄乱进度条
-                        tqdm.write(f"🟡 警告: '{filename}' 不是有效图片格式，已跳过。")
-                        skipped_count += 1
-                        continue
+    # 无需缩放的文件只涉及文件 I/O，在线程池中处理，与进程池中的缩放同时进行
+    copy_executor = ThreadPoolExecutor(max_workers=max(1, scan_workers)) if files_to_copy else None
+    copy_results = copy_executor.map(task, files_to_copy) if copy_executor is not None else iter(())
 
-                    width, height = img.size
-                    new_width = round(width * scale_factor)
-                    new_height = round(height * scale_factor)
-
-                    resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    resized_img.save(output_path)
-
-                    processed_count += 1
+    # 使用tqdm包装文件列表，自动生成进度条
+    with tqdm(total=len(files_to_process) + len(files_to_copy), desc="调整图片尺寸", unit="张", ncols=100, bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]') as pbar:
+        if workers > 1:
+            chunksize = compute_chunksize(len(files_to_process), workers)
+            pbar.write(f"   - 使用 {workers} 个进程并行处理 (每批 {chunksize} 个文件)")
+            pool = multiprocessing.Pool(processes=workers)
+            results = pool.imap_unordered(task, files_to_process, chunksize=chunksize)
+        else:
+            pool = None
+            results = map(task, files_to_process)
 
-            except Exception as e:
-                # 使用tqdm.write打印错误信息
-                tqdm.write(f"🔴 错误: 处理 '{filename}' 时发生错误: {e}")
-                skipped_count += 1
-            finally:
+        try:
+            for status, filename, message, records in itertools.chain(copy_results, results):
+                if status in ('ok', 'copied'):
+                    if status == 'ok':
+                        processed_count += 1
+                    else:
+                        copied_count += 1
+                    for level_entries, (relative_path, entry) in zip(new_entries, records):
+                        level_entries[relative_path] = entry
+                else:
+                    # 使用tqdm.write打印，避免弄乱进度条
+                    tqdm.write(message)
+                    skipped_count += 1
                 # 无论成功失败，都更新进度条
                 pbar.update(1)
+        except BaseException:
+            # 中断 (如 Ctrl+C) 时立即终止工作进程，而不是等它们处理完剩余的批次
+            if pool is not None:
+                pool.terminate()
+            if copy_executor is not None:
+                copy_executor.shutdown(cancel_futures=True)
+            raise
+        finally:
+            # 已完成的文件无论是否中断都写入索引，下次运行不必重新处理
+            if indexes is not None:
+                for level, index, level_entries in zip(levels, indexes, new_entries):
+                    if level_entries:
+                        index.update(level_entries)
+                        save_index(level["output_dir"], index)
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if copy_executor is not None:
+            copy_executor.shutdown()
 
     # --- 最终报告 ---
     print("\n--- ✨ 处理报告 ✨ ---")
     print(f"✔️ 成功处理: {processed_count} 张图片")
+    if target:
+        print(f"🔗 无需缩放，已{'硬链接' if link else '复制'}: {copied_count} 张图片")
     print(f"❌ 跳过或失败: {skipped_count} 个文件")
-    print(f"📂 所有文件已保存至: {os.path.abspath(output_dir)}")
+    if incremental:
+        print(f"♻️ 未变化而跳过: {unchanged_count} 张图片")
+    if scales:
+        for level in levels:
+            print(f"📂 比例 {level['scale']:g} 已保存至: {os.path.abspath(level['output_dir'])}")
+    else:
+        print(f"📂 所有文件已保存至: {os.path.abspath(output_dir)}")
     print("----------------------")
 
 
@@ -109,23 +537,78 @@ def main():
     # ... (命令行参数部分与上一版完全相同，无需修改)
     parser.add_argument("input_dir", help="包含图片的输入目录。")
     parser.add_argument("output_dir", help="用于保存已调整尺寸图片的输出目录。")
-    parser.add_argument("--scale", "-s", type=float, required=True, help="图片的缩放比例。\n> 1.0  放大 (例如 2.0 表示放大到2倍)\n< 1.0  缩小 (例如 0.5 表示缩小到一半)")
+    scale_group = parser.add_mutually_exclusive_group()
+    scale_group.add_argument("--scale", "-s", type=float, help="图片的缩放比例。\n> 1.0  放大 (例如 2.0 表示放大到2倍)\n< 1.0  缩小 (例如 0.5 表示缩小到一半)")
+    scale_group.add_argument("--scales", type=str, default=None, help="""以逗号分隔的一组缩放比例，输出多分辨率金字塔，例如 '0.5,0.25,0.125'。
+每张图片只解码一次，按比例从大到小逐层缩小 (每层由上一层得到)，
+分别写入 <输出目录>/images_2、images_4、images_8 (COLMAP / 3DGS 约定)。""")
+    scale_group.add_argument("--max-side", type=int, default=None, help="""按目标尺寸缩小: 长边不超过该像素数 (保持比例)。
+已不大于目标尺寸的图片不会重新编码，而是直接复制 (或配合 --link 硬链接)。""")
+    parser.add_argument("--width", type=int, default=None, help="按目标尺寸缩小: 目标宽度 (像素)。可单独使用，或与 --height 配合 --fit 使用。")
+    parser.add_argument("--height", type=int, default=None, help="按目标尺寸缩小: 目标高度 (像素)。可单独使用，或与 --width 配合 --fit 使用。")
+    parser.add_argument("--fit", type=str, default='contain', choices=FIT_MODES, help="""【可选】同时指定 --width 和 --height 时的适配方式 (默认: contain)。
+  - contain: 保持比例完整放入目标框，不裁剪
+  - cover:   保持比例铺满目标框，再居中裁剪到目标尺寸
+目标尺寸模式只缩小不放大；规划阶段只读取图片头，不解码像素。""")
+    parser.add_argument("--link", action="store_true", help="【可选】目标尺寸模式下，无需缩放的图片以硬链接代替复制 (跨文件系统时自动退回复制)。")
     parser.add_argument("--regex", "-r", type=str, default=None, help="【可选】用于筛选文件名的正则表达式。\n如果未提供，将尝试处理所有文件。\n示例:\n"
              "  - 只处理PNG图片: '.*\\.png$'\n"
              "  - 只处理JPG和JPEG图片: '.*\\.(jpg|jpeg)$'\n"
              "  - 只处理名为 'frame_5个数字.png' 的文件: '^frame_\\d{5}\\.png$'")
+    parser.add_argument("--reducing-gap", type=float, default=DEFAULT_REDUCING_GAP, help=f"""【可选】缩小时的快速解码系数 (默认: {DEFAULT_REDUCING_GAP}，与 Image.thumbnail 相同)。
+JPEG 以 DCT 域缩放 (draft) 解码到不小于目标尺寸该倍数的大小，其他格式先做整数倍 reduce，
+最后再用 LANCZOS 缩放到目标尺寸。数值越大越接近全尺寸缩放，设为 0 则关闭 (全尺寸解码)。""")
+    parser.add_argument("--incremental", action="store_true", help=f"""【可选】增量模式: 只处理新增或修改过的图片。
+输出目录中的索引 ({INDEX_FILENAME}) 记录每个输入的大小/修改时间、缩放参数与输出的大小/修改时间/SHA-1，
+输入与参数均未变化、且输出文件仍存在且未被改动时直接跳过 (只需 stat，不解码图片)。""")
+    parser.add_argument("--workers", "-j", type=int, default=1, help=f"【可选】并行缩放图片的进程数 (默认: 1，即单进程；本机 CPU 核数: {os.cpu_count()})。")
+    parser.add_argument("--scan-workers", type=int, default=DEFAULT_SCAN_WORKERS, help=f"【可选】并行遍历子目录的线程数 (默认: {DEFAULT_SCAN_WORKERS})。设为 1 则顺序扫描。")
 
     args = parser.parse_args()
 
+    target = None
+    if args.width is not None or args.height is not None:
+        if args.scale is not None or args.scales or args.max_side is not None:
+            parser.error("--width/--height 不能与 --scale、--scales 或 --max-side 同时使用。")
+    elif args.scale is None and not args.scales and args.max_side is None:
+        parser.error("必须指定 --scale、--scales、--max-side 或 --width/--height 之一。")
+    if args.max_side is not None or args.width is not None or args.height is not None:
+        if any(value is not None and value <= 0 for value in (args.max_side, args.width, args.height)):
+            parser.error("--max-side、--width 与 --height 都必须是正整数。")
+        target = {"max_side": args.max_side, "width": args.width, "height": args.height, "fit": args.fit}
+
+    scales = None
+    if args.scales:
+        try:
+            scales = [float(v) for v in args.scales.split(",") if v.strip()]
+        except ValueError:
+            parser.error(f"--scales 格式无效: '{args.scales}'，应为以逗号分隔的数字，例如 '0.5,0.25,0.125'。")
+        if not scales or any(scale <= 0 for scale in scales):
+            parser.error("--scales 中的每个比例都必须大于 0。")
+
     # ... (信息打印部分与上一版完全相同，无需修改)
     print("\n--- 🛠️ 配置信息 ---")
     print(f"➡️ 输入目录: {args.input_dir}")
     print(f"⬅️ 输出目录: {args.output_dir}")
-    print(f"📏 缩放比例: {args.scale}")
+    if target:
+        if target["max_side"]:
+            print(f"📏 目标尺寸: 长边不超过 {target['max_side']} 像素")
+        else:
+            box = f"{target['width'] or '自动'} x {target['height'] or '自动'}"
+            fit = f" ({target['fit']})" if target['width'] and target['height'] else ""
+            print(f"📏 目标尺寸: {box}{fit}")
+        print(f"🔗 无需缩放的图片: {'硬链接' if args.link else '复制'}")
+    elif scales:
+        print(f"📏 金字塔比例: {', '.join(f'{scale:g} ({pyramid_dir_name(scale)})' for scale in sorted(set(scales), reverse=True))}")
+    else:
+        print(f"📏 缩放比例: {args.scale}")
+    print(f"🧵 并行进程数: {args.workers}")
+    print(f"⚡ 快速解码系数: {args.reducing_gap if args.reducing_gap else '关闭 (全尺寸解码)'}")
+    print(f"♻️ 增量模式: {'开启' if args.incremental else '关闭'}")
     print(f"🔍 文件筛选正则: {'无 (处理所有可识别的图片)' if args.regex is None else args.regex}")
     print("----------------------\n")
 
-    resize_images_professional(args.input_dir, args.output_dir, args.scale, args.regex)
+    resize_images_professional(args.input_dir, args.output_dir, args.scale, args.regex, scan_workers=args.scan_workers, workers=args.workers, reducing_gap=args.reducing_gap, incremental=args.incremental, scales=scales, target=target, link=args.link)
 
     print("🎉 所有任务已完成！")
 
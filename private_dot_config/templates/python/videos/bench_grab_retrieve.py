@@ -0,0 +1,112 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "numpy",
+#     "opencv-python",
+# ]
+# ///
+"""
+对比 video_to_images.py 中两种顺序抽帧路径的耗时:
+- read:          每帧调用 cap.read() (解码 + 像素转换)，再丢弃非目标帧 (旧实现)。
+- grab/retrieve: 每帧调用 cap.grab()，仅对目标帧调用 cap.retrieve() (当前实现)。
+抽帧计划与 video_to_images.py 的 --fps 模式完全一致，两条路径只解码不写盘。
+"""
+import argparse
+import time
+
+try:
+    import cv2
+except ImportError:
+    print("错误: 未找到 'opencv-python' 库。")
+    print("请通过命令 'pip install opencv-python' 来安装它。")
+    exit()
+
+try:
+    import numpy as np
+except ImportError:
+    print("错误: 未找到 'numpy' 库。")
+    print("请通过命令 'pip install numpy' 来安装它。")
+    exit()
+
+
+def compute_targets(video_total_frames, video_fps, fps_to_extract):
+    """按 video_to_images.py 的 --fps 规则计算目标帧集合。"""
+    frame_step = video_fps / fps_to_extract
+    return set(np.arange(0, video_total_frames, frame_step).astype(int))
+
+
+def run_read(input_video, targets):
+    """旧路径: 对每一帧调用 read()。返回 (耗时, 保留帧数)。"""
+    cap = cv2.VideoCapture(input_video)
+    kept = 0
+    index = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index in targets:
+            kept += 1
+        index += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return elapsed, kept
+
+
+def run_grab_retrieve(input_video, targets):
+    """新路径: 对每一帧调用 grab()，只对目标帧调用 retrieve()。返回 (耗时, 保留帧数)。"""
+    cap = cv2.VideoCapture(input_video)
+    kept = 0
+    index = 0
+    start = time.perf_counter()
+    while cap.grab():
+        if index in targets:
+            ret, frame = cap.retrieve()
+            if ret:
+                kept += 1
+        index += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return elapsed, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="对比 read() 与 grab()/retrieve() 两种顺序抽帧路径在不同 --fps 比例下的耗时。",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("input_video", help="用于测试的视频文件路径 (建议使用 4K 素材)。")
+    parser.add_argument(
+        "--fps-list",
+        type=str,
+        default="0.5,1,5,15",
+        help="以逗号分隔的一组抽帧帧率 (默认: '0.5,1,5,15')。",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="每种配置重复次数，取最小值 (默认: 1)。")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.input_video)
+    if not cap.isOpened():
+        print(f"🔴 错误: 无法打开视频文件: {args.input_video}")
+        return
+    video_total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    print(f"🎞️ 视频: {width}x{height}, {video_fps:.2f} FPS, {video_total_frames} 帧")
+    print(f"{'--fps':>8} {'抽帧比例':>10} {'read (s)':>10} {'grab/retrieve (s)':>18} {'加速比':>8}")
+
+    for fps_to_extract in (float(v) for v in args.fps_list.split(",")):
+        targets = compute_targets(video_total_frames, video_fps, fps_to_extract)
+        read_time = min(run_read(args.input_video, targets)[0] for _ in range(args.repeat))
+        grab_time = min(run_grab_retrieve(args.input_video, targets)[0] for _ in range(args.repeat))
+        ratio = len(targets) / max(1, video_total_frames)
+        print(
+            f"{fps_to_extract:>8g} {ratio:>10.1%} {read_time:>10.2f} {grab_time:>18.2f} {read_time / grab_time:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,22 @@
 # ]
 # ///
 import os
+import io
+import re
+import sys
+import glob
+import json
+import hashlib
 import argparse
 import time
+import queue
+import signal
+import shutil
+import tempfile
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 
 # 尝试导入所需库，如果失败则提供安装指导
 try:
@@ -33,6 +47,689 @@ except ImportError:
     exit()
 
 
+# --- 稀疏模式的代价模型参数 ---
+# 每次实际 seek / grab 之后都会用指数滑动平均更新代价估计，以适应不同片段的 GOP 结构。
+COST_EMA_ALPHA = 0.2
+# 校准阶段用于测量顺序 grab() 开销的帧数
+CALIBRATION_GRAB_FRAMES = 8
+
+# --- 异步写盘的默认参数 ---
+# cv2.imwrite 在编码期间会释放 GIL，因此线程池即可让 PNG/JPEG 压缩真正并行。
+DEFAULT_WRITE_WORKERS = min(8, os.cpu_count() or 1)
+
+# --- npy 输出模式的文件名 ---
+NPY_FILENAME = "frames.npy"
+INDEX_FILENAME = "frames.json"
+
+# --- 内容感知选帧 (--select) 的参数 ---
+# 分析在缩略图上进行: 宽度固定为该值，高度按比例缩放
+ANALYSIS_THUMB_WIDTH = 160
+# 每个颜色通道的直方图分箱数
+ANALYSIS_HIST_BINS = 16
+# 相邻分析帧的直方图距离 (0-1) 超过该阈值即视为镜头切换
+SCENE_CUT_THRESHOLD = 0.35
+
+# --- 批量模式 ---
+# 输入为目录时会收集的视频扩展名
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v", ".mts", ".m2ts", ".ts", ".flv", ".wmv"}
+# 默认同时处理的视频数
+DEFAULT_BATCH_CONCURRENCY = max(1, (os.cpu_count() or 1) // 2)
+
+# --- 断点续传清单 ---
+MANIFEST_FILENAME = ".extract_manifest.json"
+MANIFEST_VERSION = 1
+# 清单的最短刷新间隔 (秒)，避免每写一帧都重写一次 JSON
+MANIFEST_FLUSH_INTERVAL = 5.0
+# 源文件指纹: 对开头、中间、结尾各取一块数据做哈希，避免读取整个大文件
+FINGERPRINT_CHUNK_SIZE = 1 << 20
+
+# --- FFmpeg 解码后端 ---
+# select 表达式超过该长度时改为通过 -filter_script 传入，避免命令行过长
+FILTER_SCRIPT_THRESHOLD = 4096
+# 可由 FFmpeg 直接写出的图片扩展名
+FFMPEG_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+# 未指定 JPEG 质量时与 OpenCV 默认值 (95) 保持一致
+DEFAULT_JPEG_QUALITY = 95
+
+# --- --fast 预设: 以写盘速度优先的编码参数 (显式指定的选项优先于预设) ---
+FAST_PRESET = {
+    "png_compression": 1,
+    "jpeg_quality": 90,
+    "webp_quality": 75,
+}
+
+
+def measure_access_costs(cap, video_total_frames, restore_position=0):
+    """
+    测量当前视频的两种访问代价 (单位: 秒)，返回 (grab_cost, seek_cost)。
+    - grab_cost: 顺序调用一次 grab() 跳过一帧的平均耗时 (只解码，不转换像素)。
+    - seek_cost: 通过 CAP_PROP_POS_FRAMES 随机定位一次的耗时 (定位到关键帧并解码到目标帧)。
+    测量结束后会将读取位置恢复到 restore_position。
+    """
+    start = time.perf_counter()
+    cap.set(cv2.CAP_PROP_POS_FRAMES, video_total_frames // 2)
+    seek_cost = time.perf_counter() - start
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    probe_frames = max(1, min(CALIBRATION_GRAB_FRAMES, video_total_frames))
+    start = time.perf_counter()
+    for _ in range(probe_frames):
+        if not cap.grab():
+            break
+    grab_cost = (time.perf_counter() - start) / probe_frames
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, restore_position)
+    return grab_cost, seek_cost
+
+
+def iter_target_frames(cap, target_indices, video_total_frames, sparse=False, stats=None, start_frame=0):
+    """
+    按升序遍历 target_indices，逐个产出 (帧索引, 帧图像)。
+    start_frame 大于 0 时先定位到该帧再开始读取 (用于多进程分段解码)。
+    - 普通模式: 单次顺序读取整个视频流。每帧只调用 grab() 完成解码，仅对目标帧调用 retrieve()，
+      从而跳过非目标帧的像素格式转换 (YUV -> BGR) 与内存分配。
+    - 稀疏模式: 对每个目标帧之间的间隔，根据实测代价在 "seek 定位" 与 "grab() 顺序跳过" 之间选择更快者，
+      使总工作量与请求的帧数而非视频长度成正比。
+    stats 字典 (可选) 会被写入 'seeks' 与 'skipped' 两项统计。
+    """
+    if stats is None:
+        stats = {}
+    stats.update(seeks=0, skipped=0)
+
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    if not sparse:
+        targets = set(target_indices)
+        remaining = len(targets)
+        current_frame_index = start_frame
+        while remaining > 0 and cap.isOpened():
+            if not cap.grab():
+                break  # 视频读取完毕或发生错误
+
+            # 只有目标帧才需要转换为 BGR 数组
+            if current_frame_index in targets:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                remaining -= 1
+                yield current_frame_index, frame
+            else:
+                stats["skipped"] += 1
+
+            current_frame_index += 1
+        return
+
+    grab_cost, seek_cost = measure_access_costs(cap, video_total_frames, restore_position=start_frame)
+    position = start_frame  # 下一次 grab()/read() 将返回的帧索引
+
+    for target in target_indices:
+        gap = target - position
+        if gap > 1 and gap * grab_cost > seek_cost:
+            start = time.perf_counter()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            elapsed = time.perf_counter() - start
+            seek_cost += COST_EMA_ALPHA * (elapsed - seek_cost)
+            stats["seeks"] += 1
+        elif gap > 0:
+            start = time.perf_counter()
+            for _ in range(gap):
+                if not cap.grab():
+                    return  # 视频提前结束
+            elapsed = time.perf_counter() - start
+            grab_cost += COST_EMA_ALPHA * (elapsed / gap - grab_cost)
+            stats["skipped"] += gap
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        position = target + 1
+        yield target, frame
+
+
+def build_imwrite_params(
+    output_format,
+    png_compression=None,
+    jpeg_quality=None,
+    jpeg_optimize=False,
+    jpeg_progressive=False,
+    webp_quality=None,
+    webp_lossless=False,
+    fast=False,
+):
+    """
+    根据输出文件扩展名构造 cv2.imwrite 的编码参数列表。
+    未指定的选项保持 OpenCV 默认值；fast 为 True 时，未指定的选项取 FAST_PRESET 中的值。
+    """
+    if fast:
+        png_compression = FAST_PRESET["png_compression"] if png_compression is None else png_compression
+        jpeg_quality = FAST_PRESET["jpeg_quality"] if jpeg_quality is None else jpeg_quality
+        webp_quality = FAST_PRESET["webp_quality"] if webp_quality is None else webp_quality
+
+    extension = os.path.splitext(output_format)[1].lower()
+    params = []
+    if extension == ".png":
+        if png_compression is not None:
+            params += [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    elif extension in (".jpg", ".jpeg"):
+        if jpeg_quality is not None:
+            params += [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        if jpeg_optimize:
+            params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if jpeg_progressive:
+            params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+    elif extension == ".webp":
+        # OpenCV 约定: WebP 质量大于 100 即为无损编码
+        if webp_lossless:
+            params += [cv2.IMWRITE_WEBP_QUALITY, 101]
+        elif webp_quality is not None:
+            params += [cv2.IMWRITE_WEBP_QUALITY, webp_quality]
+    return params
+
+
+def write_frame(output_path, frame, imwrite_params=None):
+    """在写盘线程中编码并保存单帧，失败时抛出异常以便在主线程中汇总。"""
+    if not cv2.imwrite(output_path, frame, imwrite_params or []):
+        raise IOError(f"cv2.imwrite 无法写入 '{output_path}'")
+
+
+def format_output_filename(output_spec, slot):
+    """根据计划中的槽位 (从 0 开始) 计算图片模式下的输出文件路径。"""
+    sequence_number = output_spec["start_number"] + slot
+    formatted_number = str(sequence_number).zfill(output_spec["padding_width"])
+    formatted_filename = output_spec["output_format"].format(i=formatted_number)
+    return os.path.join(output_spec["output_dir"], formatted_filename)
+
+
+def open_frame_sink(output_spec):
+    """
+    打开帧输出端，返回 (write, close) 两个函数 (见 open_sink_for_mode)。
+    output_spec 中含 frame_size (宽, 高) 时，每帧在写盘线程中先缩放到该尺寸再写出。
+    """
+    write, close = open_sink_for_mode(output_spec)
+    frame_size = output_spec.get("frame_size")
+    if frame_size is None:
+        return write, close
+
+    def write_resized(slot, frame):
+        write(slot, cv2.resize(frame, frame_size, interpolation=cv2.INTER_AREA))
+
+    return write_resized, close
+
+
+def open_sink_for_mode(output_spec):
+    """
+    根据 output_spec["mode"] 打开帧输出端，返回 (write, close) 两个函数。
+    write(slot, frame) 会在写盘线程中被调用；slot 为该帧在整个抽帧计划中的位置。
+    - images: 每帧编码为一个图片文件。
+    - npy:    以 RGB 顺序写入预先创建的 N×H×W×3 uint8 内存映射数组的对应槽位。
+    - rgb24:  以 RGB 顺序将原始像素写入二进制流 (要求单线程、按顺序写入)。
+    """
+    mode = output_spec["mode"]
+
+    if mode == "images":
+
+        def write(slot, frame):
+            write_frame(format_output_filename(output_spec, slot), frame, output_spec["imwrite_params"])
+
+        return write, lambda: None
+
+    if mode == "npy":
+        array = np.load(output_spec["npy_path"], mmap_mode="r+")
+
+        def write(slot, frame):
+            if frame.shape != array.shape[1:]:
+                raise ValueError(f"帧尺寸 {frame.shape} 与数组槽位尺寸 {array.shape[1:]} 不一致")
+            # 直接转换到内存映射的槽位中，避免额外的中间数组
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=array[slot])
+
+        return write, array.flush
+
+    if mode == "rgb24":
+        stream = output_spec["stream"]
+        buffer = None
+
+        def write(slot, frame):
+            nonlocal buffer
+            if buffer is None or buffer.shape != frame.shape:
+                buffer = np.empty_like(frame)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer)
+            stream.write(buffer.data)
+
+        return write, stream.flush
+
+    raise ValueError(f"未知的输出模式: {mode}")
+
+
+def collect_finished_writes(done_futures, on_progress):
+    """
+    汇总已完成的写盘任务 (future -> 槽位 的字典)，返回成功写入的帧数。
+    通过 on_progress(成功写入的槽位列表, 已完成的任务数) 回报进度。
+    """
+    written_slots = []
+    for future, slot in done_futures.items():
+        try:
+            future.result()
+            written_slots.append(slot)
+        except Exception as e:
+            tqdm.write(f"🔴 错误: 写入帧时发生错误: {e}")
+    if done_futures:
+        on_progress(written_slots, len(done_futures))
+    return len(written_slots)
+
+
+def run_extraction(frames, slots, output_spec, on_progress, workers=DEFAULT_WRITE_WORKERS, queue_size=None):
+    """
+    抽帧的核心循环: 在当前线程从 frames 迭代器中取出 (帧索引, 帧图像)，并交给写盘线程池送往输出端。
+    slots 与 frames 产出的帧按顺序一一对应，给出每一帧在整个抽帧计划中的槽位。
+    返回 (已调度帧数, 成功写入帧数)。
+    """
+    scheduled_count = 0
+    saved_count = 0
+    workers = max(1, workers)
+    if queue_size is None:
+        queue_size = workers * 4
+    queue_size = max(1, queue_size)
+    pending_writes = {}
+    write, close = open_frame_sink(output_spec)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _, frame in frames:
+                slot = slots[scheduled_count]
+                pending_writes[executor.submit(write, slot, frame)] = slot
+                scheduled_count += 1
+
+                # 在途帧达到上限时阻塞解码，等待至少一个写盘任务完成
+                if len(pending_writes) >= queue_size:
+                    done, _ = wait(pending_writes, return_when=FIRST_COMPLETED)
+                    saved_count += collect_finished_writes(
+                        {future: pending_writes.pop(future) for future in done}, on_progress
+                    )
+
+            wait(pending_writes)
+            saved_count += collect_finished_writes(pending_writes, on_progress)
+    finally:
+        close()
+
+    return scheduled_count, saved_count
+
+
+def extract_segment(
+    input_video,
+    target_indices,
+    slots,
+    video_total_frames,
+    output_spec,
+    progress_queue,
+    sparse=False,
+    workers=DEFAULT_WRITE_WORKERS,
+    queue_size=None,
+):
+    """
+    多进程模式下的工作函数: 独立打开视频，定位到本段的第一个目标帧并提取本段所有帧。
+    进度通过 progress_queue 回传给主进程。
+    """
+    cap = cv2.VideoCapture(input_video)
+    if not cap.isOpened():
+        raise IOError(f"子进程无法打开视频文件: {input_video}")
+    access_stats = {}
+    try:
+        frames = iter_target_frames(
+            cap, target_indices, video_total_frames, sparse=sparse, stats=access_stats, start_frame=target_indices[0]
+        )
+        scheduled_count, saved_count = run_extraction(
+            frames,
+            slots,
+            output_spec,
+            lambda written_slots, attempted: progress_queue.put((written_slots, attempted)),
+            workers=workers,
+            queue_size=queue_size,
+        )
+        return scheduled_count, saved_count, access_stats
+    finally:
+        cap.release()
+
+
+def run_segments_in_processes(segment_args, extraction_options, jobs, on_progress):
+    """在进程池中并行执行各段抽帧任务，并将子进程回传的进度转交给主进程的 on_progress 回调。"""
+    results = []
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=jobs) as executor:
+        progress_queue = manager.Queue()
+        futures = [
+            executor.submit(extract_segment, *args, progress_queue=progress_queue, **extraction_options)
+            for args in segment_args
+        ]
+        while True:
+            try:
+                on_progress(*progress_queue.get(timeout=0.2))
+            except queue.Empty:
+                if all(future.done() for future in futures):
+                    break
+        while not progress_queue.empty():
+            on_progress(*progress_queue.get())
+
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                tqdm.write(f"🔴 错误: 分段抽帧进程失败: {e}")
+                results.append((0, 0, {}))
+    return results
+
+
+def probe_frame_shape(cap):
+    """解码第 0 帧以获得实际的帧形状 (H, W, 3)，随后将读取位置恢复到开头。"""
+    ret, frame = cap.read()
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    if not ret:
+        return None
+    return frame.shape
+
+
+def write_frame_index(index_path, input_video, video_fps, target_indices, filled_slots, frame_shape):
+    """写出 JSON 索引: 记录数组槽位与源视频帧号、时间戳之间的对应关系。"""
+    height, width = frame_shape[:2]
+    index = {
+        "source": os.path.abspath(input_video),
+        "fps": video_fps,
+        "width": width,
+        "height": height,
+        "channel_order": "RGB",
+        "count": len(filled_slots),
+        "frames": [
+            {
+                "slot": slot,
+                "frame_index": target_indices[slot],
+                "timestamp": target_indices[slot] / video_fps if video_fps > 0 else None,
+            }
+            for slot in filled_slots
+        ],
+    }
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+
+def analyze_frames(cap, video_total_frames, stride=1, show_progress=True):
+    """
+    单次顺序扫描视频，在缩略图上计算每个分析帧的廉价特征。
+    - 清晰度: 灰度缩略图拉普拉斯响应的方差 (越大越清晰)。
+    - 颜色直方图: 每个 BGR 通道 ANALYSIS_HIST_BINS 个分箱，按通道归一化。
+    stride 大于 1 时只分析每 stride 帧中的一帧，其余帧仅 grab() 跳过。
+    返回 (帧号数组, 清晰度数组, 直方图矩阵)。
+    """
+    frame_numbers = []
+    sharpness = []
+    histograms = []
+    thumb_size = None
+    channels = [0, 1, 2]
+
+    with tqdm(
+        total=video_total_frames,
+        desc="分析视频帧",
+        unit="帧",
+        ncols=100,
+        disable=not show_progress,
+        bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
+    ) as pbar:
+        index = 0
+        while cap.grab():
+            if index % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                if thumb_size is None:
+                    height, width = frame.shape[:2]
+                    thumb_width = min(ANALYSIS_THUMB_WIDTH, width)
+                    thumb_size = (thumb_width, max(1, round(height * thumb_width / width)))
+                thumb = cv2.resize(frame, thumb_size, interpolation=cv2.INTER_AREA)
+                gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+                hist = np.stack(
+                    [cv2.calcHist([thumb], [c], None, [ANALYSIS_HIST_BINS], [0, 256]).ravel() for c in channels]
+                )
+                frame_numbers.append(index)
+                sharpness.append(cv2.Laplacian(gray, cv2.CV_32F).var())
+                histograms.append((hist / hist.sum(axis=1, keepdims=True)).ravel())
+            index += 1
+            pbar.update(1)
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return np.array(frame_numbers), np.array(sharpness, dtype=np.float32), np.array(histograms, dtype=np.float32)
+
+
+def select_keyframes(frame_numbers, sharpness, histograms, count):
+    """
+    从分析帧中挑选 count 个 "既清晰又多样" 的帧，返回升序的帧号数组与检测到的镜头数。
+    - 清晰度按排名归一化到 [0, 1]，对不同素材的绝对尺度不敏感。
+    - 多样性为候选帧到已选帧集合的最小距离，距离由直方图差异、时间间隔与是否跨镜头三部分平均得到。
+    每一步选择 "清晰度 × 多样性" 最大的帧 (首帧取最清晰者)，全部计算都是对整个候选数组的向量化运算。
+    """
+    total = len(frame_numbers)
+    channel_count = histograms.shape[1] // ANALYSIS_HIST_BINS
+
+    # 相邻分析帧的直方图距离超过阈值处视为镜头切换，为每帧分配镜头编号
+    adjacent = np.abs(np.diff(histograms, axis=0)).sum(axis=1) / (2 * channel_count)
+    scene_ids = np.concatenate([[0], np.cumsum(adjacent > SCENE_CUT_THRESHOLD)])
+    scene_count = int(scene_ids[-1]) + 1 if total else 0
+
+    if count >= total:
+        return frame_numbers, scene_count
+
+    sharp_score = np.empty(total, dtype=np.float32)
+    sharp_score[np.argsort(sharpness, kind="stable")] = np.linspace(0.0, 1.0, total, dtype=np.float32)
+    time_pos = frame_numbers / max(1, frame_numbers[-1])
+
+    selected = [int(np.argmax(sharp_score))]
+    min_distance = np.full(total, np.inf, dtype=np.float32)
+    while True:
+        last = selected[-1]
+        distance = (
+            np.abs(histograms - histograms[last]).sum(axis=1) / (2 * channel_count)
+            + np.abs(time_pos - time_pos[last])
+            + (scene_ids != scene_ids[last])
+        ) / 3
+        np.minimum(min_distance, distance, out=min_distance)
+        if len(selected) == count:
+            break
+        selected.append(int(np.argmax(sharp_score * min_distance)))
+
+    return np.sort(frame_numbers[selected]), scene_count
+
+
+def build_select_expression(indices, video_total_frames, fps_step=None):
+    """
+    为 FFmpeg 的 select 过滤器构造帧号表达式 (n 为从 0 开始的解码帧号)。
+    - fps_step 给出时优先使用闭式 "trunc(ceil(n/S)*S) == n"，其求值代价与目标帧数无关；
+      仅当它在本视频上与 indices 逐帧完全一致时才采用 (浮点运算与 numpy 相同，均为 IEEE 双精度)。
+    - 否则将 indices 压缩为连续区间，拼接 between()/eq() 项。
+    """
+    if fps_step is not None:
+        n = np.arange(video_total_frames, dtype=np.float64)
+        formula_hits = np.flatnonzero(np.trunc(np.ceil(n / fps_step) * fps_step) == n)
+        if np.array_equal(formula_hits, np.asarray(indices)):
+            return f"eq(trunc(ceil(n/{fps_step!r})*{fps_step!r})\\,n)"
+
+    terms = []
+    run_start = previous = indices[0]
+    for index in list(indices[1:]) + [None]:
+        if index is not None and index == previous + 1:
+            previous = index
+            continue
+        if run_start == previous:
+            terms.append(f"eq(n\\,{run_start})")
+        else:
+            terms.append(f"between(n\\,{run_start}\\,{previous})")
+        run_start = previous = index
+    return "+".join(terms)
+
+
+def ffmpeg_image_args(output_format, imwrite_params):
+    """将 cv2.imwrite 的编码参数转换为 FFmpeg 图片编码器的等价参数。"""
+    params = dict(zip(imwrite_params[::2], imwrite_params[1::2])) if imwrite_params else {}
+    extension = os.path.splitext(output_format)[1].lower()
+    if extension == ".png" and cv2.IMWRITE_PNG_COMPRESSION in params:
+        return ["-compression_level", str(params[cv2.IMWRITE_PNG_COMPRESSION])]
+    if extension in (".jpg", ".jpeg"):
+        # FFmpeg 的 mjpeg 使用 qscale (2 最好, 31 最差)，按线性关系从 0-100 的质量换算
+        quality = params.get(cv2.IMWRITE_JPEG_QUALITY, DEFAULT_JPEG_QUALITY)
+        return ["-q:v", str(round(2 + (100 - quality) * 29 / 100))]
+    if extension == ".webp" and cv2.IMWRITE_WEBP_QUALITY in params:
+        quality = params[cv2.IMWRITE_WEBP_QUALITY]
+        return ["-lossless", "1"] if quality > 100 else ["-quality", str(quality)]
+    return []
+
+
+def iter_pipe_frames(stream, frame_shape, indices):
+    """从 FFmpeg 的 rawvideo (bgr24) 输出管道中按顺序读取帧，逐个产出 (帧索引, 帧图像)。"""
+    frame_bytes = int(np.prod(frame_shape))
+    for index in indices:
+        frame = np.empty(frame_shape, dtype=np.uint8)
+        view = memoryview(frame).cast("B")
+        filled = 0
+        while filled < frame_bytes:
+            count = stream.readinto(view[filled:])
+            if not count:
+                return  # 视频提前结束
+            filled += count
+        yield index, frame
+
+
+def run_ffmpeg_extraction(
+    input_video,
+    indices,
+    slots,
+    video_total_frames,
+    output_spec,
+    frame_shape,
+    on_progress,
+    fps_step=None,
+    workers=DEFAULT_WRITE_WORKERS,
+    queue_size=None,
+):
+    """
+    使用 FFmpeg 解码: 通过 select 过滤器只输出目标帧，并在过滤器内完成缩放 (解码器自动多线程)。
+    - 图片模式且待提取槽位连续时，由 FFmpeg 直接写出图片文件，通过 -progress 汇报进度。
+    - 其余情况以 rawvideo (bgr24) 通过管道交给 Python，复用与 OpenCV 后端相同的输出端与写盘线程池。
+    返回 (已调度帧数, 成功写入帧数, 访问统计)。
+    """
+    height, width = frame_shape[:2]
+    filters = f"select='{build_select_expression(indices, video_total_frames, fps_step)}'"
+    if output_spec.get("frame_size") is not None:
+        filters += f",scale={width}:{height}:flags=area"
+    # FFmpeg 输出的帧已是目标尺寸，不再需要在写盘线程中缩放
+    output_spec = {key: value for key, value in output_spec.items() if key != "frame_size"}
+
+    output_format = output_spec.get("output_format", "")
+    direct = (
+        output_spec["mode"] == "images"
+        and "{i}" in output_format
+        and os.path.splitext(output_format)[1].lower() in FFMPEG_IMAGE_EXTENSIONS
+        and slots == list(range(slots[0], slots[0] + len(slots)))
+    )
+
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-threads", "0", "-i", input_video]
+    filter_script_path = None
+    if len(filters) > FILTER_SCRIPT_THRESHOLD:
+        with tempfile.NamedTemporaryFile("w", delete=False, suffix=".txt", encoding="utf-8") as f:
+            f.write(filters)
+            filter_script_path = f.name
+        cmd += ["-filter_script:v", filter_script_path]
+    else:
+        cmd += ["-vf", filters]
+    # -vsync 在 FFmpeg 4.x 中即可使用 (-fps_mode 要求 5.1+)，6.x/7.x 中仍可用 (已标记为弃用)
+    cmd += ["-vsync", "passthrough", "-frames:v", str(len(indices))]
+
+    if direct:
+        pattern = output_format.replace("%", "%%").replace("{i}", f"%0{output_spec['padding_width']}d")
+        cmd += ffmpeg_image_args(output_format, output_spec["imwrite_params"])
+        cmd += ["-start_number", str(output_spec["start_number"] + slots[0]), "-y"]
+        cmd += ["-progress", "pipe:1", "-nostats", os.path.join(output_spec["output_dir"], pattern)]
+    else:
+        cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        try:
+            if direct:
+                reported = 0
+                for line in io.TextIOWrapper(process.stdout, encoding="utf-8"):
+                    key, _, value = line.strip().partition("=")
+                    if key == "frame" and value.isdigit() and int(value) > reported:
+                        on_progress(slots[reported : int(value)], int(value) - reported)
+                        reported = int(value)
+                process.wait()
+                scheduled_count = saved_count = reported if process.returncode == 0 else 0
+            else:
+                frames = iter_pipe_frames(process.stdout, frame_shape, indices)
+                scheduled_count, saved_count = run_extraction(
+                    frames, slots, output_spec, on_progress, workers=workers, queue_size=queue_size
+                )
+                process.stdout.close()
+                process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if filter_script_path:
+                os.remove(filter_script_path)
+
+        if process.returncode != 0:
+            stderr_file.seek(0)
+            tqdm.write("🔴 错误: FFmpeg 执行失败。")
+            tqdm.write(stderr_file.read().decode("utf-8", errors="replace").strip())
+    return scheduled_count, saved_count, {}
+
+
+def file_fingerprint(path):
+    """计算源文件的轻量指纹 (大小、修改时间与首/中/尾数据块的哈希)，用于判断清单是否仍然有效。"""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for offset in (0, stat.st_size // 2, max(0, stat.st_size - FINGERPRINT_CHUNK_SIZE)):
+            f.seek(offset)
+            digest.update(f.read(FINGERPRINT_CHUNK_SIZE))
+    return {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sample_sha256": digest.hexdigest(),
+    }
+
+
+def read_manifest(manifest_path):
+    """读取清单文件，文件不存在、损坏或版本不符时返回 None。"""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def load_completed_slots(manifest_path, plan):
+    """
+    读取已有的清单。只有当记录的计划与本次计划完全一致时，才返回其中已完成的槽位集合；
+    清单不存在返回空集合，计划不一致返回 None。
+    """
+    if not os.path.exists(manifest_path):
+        return set()
+    manifest = read_manifest(manifest_path)
+    if manifest is None or manifest.get("plan") != plan:
+        return None
+    return set(manifest.get("completed", []))
+
+
+def save_manifest(manifest_path, plan, completed_slots):
+    """以原子替换的方式写出清单，保证进程中途被杀时清单仍然完整可读。"""
+    manifest = {"version": MANIFEST_VERSION, "plan": plan, "completed": sorted(completed_slots)}
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+
 def extract_frames_professional(
     input_video,
     output_dir,
@@ -41,11 +738,39 @@ def extract_frames_professional(
     total_frames=None,
     start_number=1,
     padding=None,
+    sparse=False,
+    workers=DEFAULT_WRITE_WORKERS,
+    queue_size=None,
+    jobs=1,
+    imwrite_params=None,
+    output_mode="images",
+    output_stream=None,
+    resume=True,
+    select_count=None,
+    analysis_stride=1,
+    show_progress=True,
+    progress_hook=None,
+    backend="opencv",
+    scale=None,
 ):
     """
     以专业的用户体验和优化的性能处理视频抽帧任务。
     - 阶段1: 分析视频、计算抽帧计划。
     - 阶段2: 通过单次顺序读取视频流高效提取帧，并使用tqdm进度条提供实时反馈。
+      启用 sparse 时改为按间隔自适应地 seek 或顺序跳帧，适合从长视频中抽取少量帧。
+    - 解码在主线程进行，图片编码与写盘交给 workers 个线程；queue_size 限制在途帧数以形成背压。
+    - jobs 大于 1 时，将目标帧划分为 jobs 个连续段，由各自打开视频的子进程并行解码，输出编号与单进程一致。
+    - imwrite_params 为传给 cv2.imwrite 的编码参数 (见 build_imwrite_params)。
+    - output_mode 为 'npy' 时所有帧写入 output_dir 下的单个内存映射数组 (附 JSON 索引)；
+      为 'rgb24' 时原始像素按顺序写入 output_stream (默认为标准输出)，output_dir 为 '-' 时不写索引。
+    - images/npy 模式会在 output_dir 中维护断点续传清单；resume 为 True 且计划未变时，只提取缺失的帧。
+    - select_count 启用内容感知选帧: 先在缩略图上单次扫描计算清晰度与颜色直方图，
+      再挑选最清晰且最多样的 select_count 帧，随后以稀疏模式提取。
+    - progress_hook(kind, n) 用于批量模式向外汇报进度: kind 为 'plan' 时 n 为本次待提取帧数，
+      为 'done' 时 n 为新完成的帧数。show_progress 为 False 时不显示本函数自己的进度条。
+    - backend 为 'ffmpeg' 时改用 FFmpeg 多线程解码 + select 过滤器输出目标帧 (此时忽略 sparse 与 jobs)。
+    - scale 为输出帧的缩放比例 (FFmpeg 后端在过滤器内缩放，OpenCV 后端在写盘线程中缩放)。
+    成功时返回 {'planned', 'extracted', 'completed'} 统计字典，出错时返回 None。
     """
 
     # --- 阶段 1: 视频分析与准备 ---
@@ -55,6 +780,11 @@ def extract_frames_professional(
         print(f"\n🔴 错误: 输入的视频文件不存在: {input_video}")
         return
 
+    if backend == "ffmpeg" and not shutil.which("ffmpeg"):
+        print("\n🔴 错误: 'ffmpeg' 命令未找到。")
+        print("请安装 FFmpeg 并确保它在系统的 PATH 环境变量中。")
+        return
+
     cap = cv2.VideoCapture(input_video)
     if not cap.isOpened():
         print(
@@ -65,20 +795,53 @@ def extract_frames_professional(
     video_total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     video_fps = cap.get(cv2.CAP_PROP_FPS)
 
-    os.makedirs(output_dir, exist_ok=True)
+    write_index = not (output_mode == "rgb24" and output_dir == "-")
+    if write_index:
+        os.makedirs(output_dir, exist_ok=True)
+
+    use_manifest = output_mode in ("images", "npy")
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    source_fingerprint = file_fingerprint(input_video) if use_manifest else None
+    selection = None
+    fps_step = None
 
     # --- 计算需要提取的帧索引 ---
-    if fps_to_extract:
+    if select_count:
+        selection = {"count": select_count, "stride": max(1, analysis_stride)}
+        previous = read_manifest(manifest_path) if use_manifest and resume else None
+        if (
+            previous is not None
+            and previous["plan"].get("selection") == selection
+            and previous["plan"].get("source") == source_fingerprint
+        ):
+            # 源文件与选帧参数均未改变: 直接复用上次的选帧结果，跳过分析扫描
+            frame_indices = np.array(previous["plan"]["frame_indices"], dtype=int)
+            print(f"   - ♻️ 复用续传清单中的选帧结果 ({len(frame_indices)} 帧)，跳过内容分析。")
+        else:
+            print("   - 正在缩略图上分析清晰度与画面变化...")
+            frame_numbers, sharpness, histograms = analyze_frames(
+                cap, video_total_frames, selection["stride"], show_progress=show_progress
+            )
+            if len(frame_numbers) == 0:
+                print("\n🔴 错误: 未能解码任何视频帧，无法进行内容分析。")
+                cap.release()
+                return
+            frame_indices, scene_count = select_keyframes(frame_numbers, sharpness, histograms, select_count)
+            print(f"   - 分析了 {len(frame_numbers)} 帧，检测到 {scene_count} 个镜头。")
+        # 选中的帧通常稀疏分布，由代价模型决定逐段 seek 还是顺序跳过
+        sparse = True
+    elif fps_to_extract:
         if video_fps <= 0:
             print("\n🔴 错误: 无法读取源视频的FPS信息，无法使用 --fps 模式。")
             cap.release()
             return
         frame_step = video_fps / fps_to_extract
         frame_indices = np.arange(0, video_total_frames, frame_step).astype(int)
+        fps_step = frame_step
     elif total_frames:
         frame_indices = np.round(np.linspace(0, video_total_frames - 1, total_frames)).astype(int)
     else:
-        print("\n🔴 错误: 必须指定一个抽帧模式 (--fps 或 --frames)。")
+        print("\n🔴 错误: 必须指定一个抽帧模式 (--fps、--frames 或 --select)。")
         cap.release()
         return
 
@@ -98,55 +861,353 @@ def extract_frames_professional(
         last_number = start_number + num_frames_to_extract - 1
         padding_width = len(str(last_number))
 
+    target_indices = [int(i) for i in sorted(frames_to_extract_set)]
+
+    image_spec = dict(
+        mode="images",
+        output_dir=output_dir,
+        output_format=output_format,
+        start_number=start_number,
+        padding_width=padding_width,
+        imwrite_params=imwrite_params,
+    )
+
+    # --- 确定输出帧尺寸 ---
+    source_shape = probe_frame_shape(cap)
+    if source_shape is None:
+        print("\n🔴 错误: 无法解码视频的第一帧。")
+        cap.release()
+        return
+    frame_size = None
+    frame_shape = source_shape
+    if scale is not None and scale != 1:
+        frame_size = (max(1, round(source_shape[1] * scale)), max(1, round(source_shape[0] * scale)))
+        frame_shape = (frame_size[1], frame_size[0], source_shape[2])
+        print(f"   - 输出帧将从 {source_shape[1]}x{source_shape[0]} 缩放至 {frame_size[0]}x{frame_size[1]}。")
+    image_spec["frame_size"] = frame_size
+
+    # --- 断点续传: 校验清单，找出已完成的槽位 ---
+    completed_slots = set()
+    if use_manifest:
+        plan = {
+            "source": source_fingerprint,
+            "selection": selection,
+            "frame_indices": target_indices,
+            "output_mode": output_mode,
+            "output_format": output_format if output_mode == "images" else NPY_FILENAME,
+            "start_number": start_number,
+            "padding_width": padding_width,
+            "frame_shape": list(frame_shape),
+        }
+        if output_mode == "images":
+            # 编码参数不同则已有文件不可复用: 记录 imwrite 参数，以及 FFmpeg 后端直接写图时实际使用的编码器参数
+            plan["imwrite_params"] = [int(value) for value in (imwrite_params or [])]
+            if backend == "ffmpeg":
+                plan["ffmpeg_image_args"] = ffmpeg_image_args(output_format, imwrite_params)
+        previous_slots = load_completed_slots(manifest_path, plan) if resume else set()
+        if previous_slots is None:
+            print("   - 🟡 已有的续传清单与本次计划不一致 (源文件或参数已改变)，将重新提取全部帧。")
+        elif previous_slots:
+            if output_mode == "images":
+                # 只信任磁盘上仍然存在的文件
+                completed_slots = {
+                    slot for slot in previous_slots if os.path.exists(format_output_filename(image_spec, slot))
+                }
+            elif os.path.exists(os.path.join(output_dir, NPY_FILENAME)):
+                completed_slots = previous_slots
+
+    # --- 准备输出端 ---
+    if output_mode == "images":
+        output_spec = image_spec
+    else:
+        if output_mode == "npy":
+            npy_path = os.path.join(output_dir, NPY_FILENAME)
+            if not completed_slots:
+                # 预先分配完整的数组文件，之后各线程/进程只按槽位写入
+                np.lib.format.open_memmap(
+                    npy_path, mode="w+", dtype=np.uint8, shape=(num_frames_to_extract, *frame_shape)
+                ).flush()
+            output_spec = dict(mode="npy", npy_path=npy_path, frame_size=frame_size)
+        else:
+            # 原始流必须按顺序写出，因此强制单进程、单写线程
+            if jobs > 1 or workers > 1:
+                print("   - rgb24 模式需要按顺序输出，已强制使用单进程、单写线程。")
+            jobs, workers = 1, 1
+            stream = output_stream if output_stream is not None else sys.stdout.buffer
+            output_spec = dict(mode="rgb24", stream=stream, frame_size=frame_size)
+        print(
+            f"🧱 帧尺寸: {frame_shape[1]}x{frame_shape[0]}, 每帧 {int(np.prod(frame_shape))} 字节 (RGB, uint8)"
+        )
+
+    pending_slots = [slot for slot in range(num_frames_to_extract) if slot not in completed_slots]
+    pending_indices = [target_indices[slot] for slot in pending_slots]
+
     print(f"✅ 分析完成: 将从视频中提取 {num_frames_to_extract} 帧。")
-    print("\n🚀 [阶段 2/2] 开始提取帧 (已启用性能优化)...")
-    time.sleep(1)
+    if progress_hook is not None:
+        progress_hook("plan", len(pending_slots))
+    if not pending_slots:
+        cap.release()
+        print("\n✔️ 续传清单显示所有帧均已提取完成，无需重复处理。")
+        return {"planned": num_frames_to_extract, "extracted": 0, "completed": len(completed_slots)}
+    if completed_slots:
+        print(f"♻️ 断点续传: 清单显示已完成 {len(completed_slots)} 帧，本次只需提取剩余的 {len(pending_slots)} 帧。")
+    if backend == "ffmpeg":
+        print("\n🚀 [阶段 2/2] 开始提取帧 (FFmpeg 多线程解码 + select 过滤器)...")
+    elif sparse:
+        print("\n🚀 [阶段 2/2] 开始提取帧 (稀疏模式: 按实测代价自适应 seek)...")
+    else:
+        print("\n🚀 [阶段 2/2] 开始提取帧 (已启用性能优化)...")
+    if show_progress:
+        time.sleep(1)
 
     # --- 阶段 2: 高效提取帧 ---
-    current_frame_index = 0
-    saved_count = 0
+    jobs = max(1, min(jobs, len(pending_slots)))
+    extraction_options = dict(sparse=sparse, workers=workers, queue_size=queue_size)
+    if use_manifest:
+        save_manifest(manifest_path, plan, completed_slots)
 
     with tqdm(
-        total=num_frames_to_extract,
+        total=len(pending_slots),
         desc="提取视频帧",
         unit="帧",
         ncols=100,
+        disable=not show_progress,
         bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
     ) as pbar:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break  # 视频读取完毕或发生错误
-
-            # 检查当前帧是否是我们需要保存的目标
-            if current_frame_index in frames_to_extract_set:
-                sequence_number = start_number + saved_count
-                formatted_number = str(sequence_number).zfill(padding_width)
-                formatted_filename = output_format.format(i=formatted_number)
-                output_path = os.path.join(output_dir, formatted_filename)
-
-                cv2.imwrite(output_path, frame)
+        last_flush = time.monotonic()
 
-                saved_count += 1
-                pbar.update(1)
+        def on_progress(written_slots, attempted):
+            """推进进度条、记录完成的槽位，并定期刷新清单。"""
+            nonlocal last_flush
+            pbar.update(attempted)
+            if progress_hook is not None:
+                progress_hook("done", attempted)
+            completed_slots.update(written_slots)
+            if use_manifest and time.monotonic() - last_flush >= MANIFEST_FLUSH_INTERVAL:
+                save_manifest(manifest_path, plan, completed_slots)
+                last_flush = time.monotonic()
 
-                # 如果已保存所有需要的帧，提前退出循环
-                if saved_count == num_frames_to_extract:
-                    break
+        try:
+            if backend == "ffmpeg":
+                cap.release()
+                # 仅当待提取帧与完整的 --fps 计划一致时，才可使用闭式 select 表达式
+                formula_step = fps_step if len(pending_indices) == num_frames_to_extract else None
+                results = [
+                    run_ffmpeg_extraction(
+                        input_video,
+                        pending_indices,
+                        pending_slots,
+                        video_total_frames,
+                        output_spec,
+                        frame_shape,
+                        on_progress,
+                        fps_step=formula_step,
+                        workers=workers,
+                        queue_size=queue_size,
+                    )
+                ]
+            elif jobs == 1:
+                access_stats = {}
+                frames = iter_target_frames(
+                    cap, pending_indices, video_total_frames, sparse=sparse, stats=access_stats
+                )
+                scheduled_count, saved_count = run_extraction(
+                    frames, pending_slots, output_spec, on_progress, workers=workers, queue_size=queue_size
+                )
+                results = [(scheduled_count, saved_count, access_stats)]
+                cap.release()
+            else:
+                # 子进程各自打开视频，主进程的句柄不再需要
+                cap.release()
+                segment_args = [
+                    (input_video, [int(i) for i in indices], [int(s) for s in slots], video_total_frames, output_spec)
+                    for indices, slots in zip(
+                        np.array_split(np.array(pending_indices), jobs), np.array_split(np.array(pending_slots), jobs)
+                    )
+                ]
+                results = run_segments_in_processes(segment_args, extraction_options, jobs, on_progress)
+        finally:
+            if use_manifest:
+                save_manifest(manifest_path, plan, completed_slots)
 
-            current_frame_index += 1
+    scheduled_count = sum(r[0] for r in results)
+    saved_count = sum(r[1] for r in results)
+    access_stats = {
+        key: sum(r[2].get(key, 0) for r in results) for key in ("seeks", "skipped")
+    }
 
-    cap.release()
+    if output_mode != "images" and write_index:
+        write_frame_index(
+            os.path.join(output_dir, INDEX_FILENAME),
+            input_video,
+            video_fps,
+            target_indices,
+            sorted(completed_slots),
+            frame_shape,
+        )
 
     # --- 最终报告 ---
     print("\n--- ✨ 处理报告 ✨ ---")
-    if saved_count < num_frames_to_extract:
+    if scheduled_count < len(pending_slots):
         print(
-            f"🟡 警告: 计划提取 {num_frames_to_extract} 帧, 但因视频提前结束只成功提取了 {saved_count} 帧。"
+            f"🟡 警告: 计划提取 {num_frames_to_extract} 帧, 但因视频提前结束只成功提取了 {len(completed_slots)} 帧。"
         )
+    elif saved_count < scheduled_count:
+        print(f"🟡 警告: {scheduled_count - saved_count} 帧写入失败, 成功提取 {len(completed_slots)} 帧。")
     else:
         print(f"✔️ 成功提取: {saved_count} 帧")
-    print(f"📂 所有图片已保存至: {os.path.abspath(output_dir)}")
+    if use_manifest and len(completed_slots) < num_frames_to_extract:
+        print("♻️ 重新运行相同的命令即可只补齐缺失的帧。")
+    if sparse and backend != "ffmpeg":
+        print(f"⏩ 访问统计: seek {access_stats['seeks']} 次, 顺序跳过 {access_stats['skipped']} 帧")
+    if output_mode == "images":
+        print(f"📂 所有图片已保存至: {os.path.abspath(output_dir)}")
+    elif output_mode == "npy":
+        print(f"📦 帧数组已保存至: {os.path.abspath(os.path.join(output_dir, NPY_FILENAME))}")
+        print(f"🗂️ 帧索引已保存至: {os.path.abspath(os.path.join(output_dir, INDEX_FILENAME))}")
+    else:
+        print("📤 原始 rgb24 帧已写入标准输出。")
+        if write_index:
+            print(f"🗂️ 帧索引已保存至: {os.path.abspath(os.path.join(output_dir, INDEX_FILENAME))}")
+    print("----------------------")
+    return {"planned": num_frames_to_extract, "extracted": saved_count, "completed": len(completed_slots)}
+
+
+def natural_sort_key(s):
+    """为字符串提供自然排序的键，例如 'clip10.mp4' 会在 'clip2.mp4' 之后。"""
+    return [int(text) if text.isdigit() else text.lower() for text in re.split("([0-9]+)", s)]
+
+
+def resolve_input_videos(input_spec):
+    """
+    将命令行的输入解析为视频文件列表，返回 (视频列表, 是否为批量模式)。
+    - 目录: 收集其中 (不递归) 扩展名属于 VIDEO_EXTENSIONS 的文件。
+    - 含通配符的模式: 按 glob 展开 (支持 '**' 递归)。
+    - .txt 文件: 每行一个视频路径，忽略空行与 '#' 开头的注释行，相对路径相对于列表文件所在目录。
+    - 其他: 视为单个视频文件。
+    """
+    if os.path.isdir(input_spec):
+        videos = [
+            entry.path
+            for entry in os.scandir(input_spec)
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+        ]
+    elif glob.has_magic(input_spec):
+        videos = [path for path in glob.glob(input_spec, recursive=True) if os.path.isfile(path)]
+    elif input_spec.lower().endswith(".txt") and os.path.isfile(input_spec):
+        base_dir = os.path.dirname(os.path.abspath(input_spec))
+        with open(input_spec, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        videos = [os.path.join(base_dir, line) for line in lines if line and not line.startswith("#")]
+        return videos, True
+    else:
+        return [input_spec], False
+    return sorted(videos, key=lambda path: natural_sort_key(os.path.basename(path))), True
+
+
+def assign_output_dirs(videos, output_dir):
+    """为每个视频分配 output_dir 下以文件名 (去扩展名) 命名的子目录，重名时追加 '_2'、'_3' 等后缀。"""
+    used = {}
+    output_dirs = []
+    for video in videos:
+        stem = os.path.splitext(os.path.basename(video))[0]
+        used[stem] = used.get(stem, 0) + 1
+        name = stem if used[stem] == 1 else f"{stem}_{used[stem]}"
+        output_dirs.append(os.path.join(output_dir, name))
+    return output_dirs
+
+
+def extract_video_job(video_id, input_video, output_dir, options, progress_queue):
+    """
+    批量模式的工作函数: 在进程池中静默处理单个视频，进度通过 progress_queue 回传。
+    本函数的常规输出被捕获，出错时将其中的错误信息随结果一起返回。
+    """
+    captured = io.StringIO()
+    start = time.perf_counter()
+    with redirect_stdout(captured):
+        result = extract_frames_professional(
+            input_video,
+            output_dir,
+            show_progress=False,
+            progress_hook=lambda kind, n: progress_queue.put((video_id, kind, n)),
+            **options,
+        )
+    errors = [line.strip() for line in captured.getvalue().splitlines() if "🔴" in line or "🟡" in line]
+    return {"result": result, "elapsed": time.perf_counter() - start, "messages": errors}
+
+
+def extract_batch(videos, output_dir, options, concurrency):
+    """
+    批量模式: 所有视频共用同一个进程池 (最多 concurrency 个视频同时处理)，
+    各视频输出到独立子目录，主进程显示全局进度条并在结束时打印每个视频的统计。
+    """
+    output_dirs = assign_output_dirs(videos, output_dir)
+    concurrency = max(1, min(concurrency, len(videos)))
+    print(f"📚 批量模式: 共 {len(videos)} 个视频，最多同时处理 {concurrency} 个。")
+
+    reports = [None] * len(videos)
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=concurrency) as executor:
+        progress_queue = manager.Queue()
+        futures = {
+            executor.submit(extract_video_job, video_id, video, video_output_dir, options, progress_queue): video_id
+            for video_id, (video, video_output_dir) in enumerate(zip(videos, output_dirs))
+        }
+
+        with tqdm(
+            total=0,
+            desc="批量抽帧",
+            unit="帧",
+            ncols=100,
+            bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]",
+        ) as pbar:
+            finished_videos = 0
+            pbar.set_postfix_str(f"视频 0/{len(videos)}")
+
+            def drain_progress(timeout):
+                try:
+                    _, kind, n = progress_queue.get(timeout=timeout)
+                except queue.Empty:
+                    return False
+                if kind == "plan":
+                    pbar.total += n
+                    pbar.refresh()
+                else:
+                    pbar.update(n)
+                return True
+
+            pending = set(futures)
+            while pending:
+                drain_progress(0.2)
+                for future in [f for f in pending if f.done()]:
+                    pending.discard(future)
+                    video_id = futures[future]
+                    try:
+                        reports[video_id] = future.result()
+                    except Exception as e:
+                        reports[video_id] = {"result": None, "elapsed": 0.0, "messages": [f"🔴 进程异常: {e}"]}
+                    finished_videos += 1
+                    pbar.set_postfix_str(f"视频 {finished_videos}/{len(videos)}")
+            while drain_progress(0):
+                pass
+
+    # --- 批量报告 ---
+    print("\n--- ✨ 批量处理报告 ✨ ---")
+    failed = 0
+    for video, video_output_dir, report in zip(videos, output_dirs, reports):
+        name = os.path.basename(video)
+        result = report["result"]
+        if result is None:
+            failed += 1
+            reason = report["messages"][0] if report["messages"] else "未知错误"
+            print(f"❌ {name}: 失败 ({reason})")
+            continue
+        rate = result["extracted"] / report["elapsed"] if report["elapsed"] > 0 else 0.0
+        status = "✔️" if result["completed"] >= result["planned"] else "🟡"
+        print(
+            f"{status} {name}: {result['completed']}/{result['planned']} 帧 "
+            f"(本次提取 {result['extracted']} 帧, {report['elapsed']:.1f}s, {rate:.1f} 帧/s) -> {video_output_dir}"
+        )
+    print(f"📊 成功 {len(videos) - failed} 个, 失败 {failed} 个")
     print("----------------------")
 
 
@@ -158,8 +1219,18 @@ def main():
     )
 
     # --- 位置参数 ---
-    parser.add_argument("input_video", help="待处理的视频文件路径。")
-    parser.add_argument("output_dir", help="用于保存所提取图片的输出目录。")
+    parser.add_argument(
+        "input_video",
+        help="待处理的视频文件路径。也可以是以下任一形式，从而进入批量模式:\n"
+        "  - 一个目录 (处理其中所有视频文件)\n"
+        "  - 一个通配符模式，例如 'clips/**/*.mp4' (请加引号)\n"
+        "  - 一个 .txt 列表文件，每行一个视频路径",
+    )
+    parser.add_argument(
+        "output_dir",
+        help="用于保存所提取图片的输出目录。批量模式下每个视频输出到其中以文件名命名的子目录。\n"
+        "--output-mode rgb24 时可传 '-'，表示不写出 JSON 索引。",
+    )
 
     # --- 抽帧模式参数 (互斥) ---
     extraction_group = parser.add_mutually_exclusive_group(required=True)
@@ -175,6 +1246,23 @@ def main():
         help="指定总共要从整个视频中提取的图片总数。\n"
         "程序将会在视频时长内均匀选取对应数量的帧。",
     )
+    extraction_group.add_argument(
+        "--select",
+        type=int,
+        help="按画面内容挑选指定数量的关键帧 (适用于 3DGS/COLMAP 数据集制作)。\n"
+        "程序先在缩略图上单次扫描整段视频，计算清晰度 (拉普拉斯方差) 与颜色直方图，\n"
+        "再挑选最清晰、且画面与时间分布最多样的帧，最后以稀疏模式提取。",
+    )
+
+    # --- 内容分析参数 ---
+    analysis_group = parser.add_argument_group("内容分析选项 (配合 --select)")
+    analysis_group.add_argument(
+        "--analysis-stride",
+        type=int,
+        default=1,
+        help="【可选】分析时每隔多少帧取一帧 (默认为: 1，即分析每一帧)。\n"
+        "对高帧率素材设置为 2-5 可显著缩短分析时间。",
+    )
 
     # --- 命名格式参数 ---
     naming_group = parser.add_argument_group("文件名格式化选项")
@@ -202,8 +1290,162 @@ def main():
         "如果未设置，脚本将根据提取总数和起始序号自动计算最佳宽度。",
     )
 
+    # --- 输出模式 ---
+    output_group = parser.add_argument_group("输出模式选项")
+    output_group.add_argument(
+        "--output-mode",
+        type=str,
+        default="images",
+        choices=["images", "npy", "rgb24"],
+        help="""【可选】选择帧的输出方式 (默认: 'images')。
+'images': 每帧保存为一个图片文件。
+'npy':    所有帧写入输出目录下的单个内存映射数组 frames.npy (N×H×W×3, uint8, RGB)，
+          并生成 frames.json 记录槽位与源帧号、时间戳的对应关系。
+'rgb24':  将原始 RGB 像素按顺序写到标准输出，便于用管道交给其他程序；
+          此时所有日志改为输出到标准错误。""",
+    )
+
+    # --- 解码后端 ---
+    backend_group = parser.add_argument_group("解码后端选项")
+    backend_group.add_argument(
+        "--backend",
+        type=str,
+        default="opencv",
+        choices=["opencv", "ffmpeg"],
+        help="""【可选】选择视频解码后端 (默认: 'opencv')。
+'opencv': 使用 OpenCV 解码，支持 --sparse 与 --jobs。
+'ffmpeg': 调用外部 FFmpeg，使用其多线程解码器并通过 select 过滤器只输出目标帧，
+          对 H.265 等高分辨率素材通常快得多。图片模式下由 FFmpeg 直接写出文件，
+          其他情况通过管道将原始帧交给 Python。需要手动安装 FFmpeg。""",
+    )
+    backend_group.add_argument(
+        "--scale",
+        type=float,
+        default=None,
+        help="【可选】输出帧的缩放比例，例如 0.5 表示宽高各缩小一半。\n"
+        "FFmpeg 后端在过滤器内完成缩放，OpenCV 后端在写盘线程中缩放。",
+    )
+
+    # --- 图片编码参数 ---
+    encoding_group = parser.add_argument_group("图片编码选项")
+    encoding_group.add_argument(
+        "--png-compression",
+        type=int,
+        choices=range(0, 10),
+        metavar="{0-9}",
+        default=None,
+        help="【可选】PNG 压缩级别，0 为不压缩 (最快)，9 为最高压缩 (最慢)。\n"
+        "未设置时使用 OpenCV 默认值。",
+    )
+    encoding_group.add_argument(
+        "--jpeg-quality",
+        type=int,
+        choices=range(0, 101),
+        metavar="{0-100}",
+        default=None,
+        help="【可选】JPEG 质量 (0-100)。未设置时使用 OpenCV 默认值 (95)。",
+    )
+    encoding_group.add_argument(
+        "--jpeg-optimize", action="store_true", help="【可选】启用 JPEG 霍夫曼表优化 (文件更小，编码更慢)。"
+    )
+    encoding_group.add_argument(
+        "--jpeg-progressive", action="store_true", help="【可选】输出渐进式 JPEG。"
+    )
+    encoding_group.add_argument(
+        "--webp-quality",
+        type=int,
+        choices=range(1, 101),
+        metavar="{1-100}",
+        default=None,
+        help="【可选】WebP 有损编码质量 (1-100)。",
+    )
+    encoding_group.add_argument(
+        "--webp-lossless", action="store_true", help="【可选】使用无损 WebP 编码 (忽略 --webp-quality)。"
+    )
+    encoding_group.add_argument(
+        "--fast",
+        action="store_true",
+        help="【可选】写盘速度优先的预设: PNG 压缩级别 1、JPEG 质量 90、WebP 质量 75。\n"
+        "显式指定的编码选项优先于预设。",
+    )
+
+    # --- 性能选项 ---
+    performance_group = parser.add_argument_group("性能选项")
+    performance_group.add_argument(
+        "--sparse",
+        action="store_true",
+        help="【可选】启用稀疏抽帧模式。\n"
+        "对每段帧间隔，根据实测代价在关键帧 seek 与 grab() 顺序跳帧之间自动选择，\n"
+        "适合从长视频中抽取少量帧 (例如 --frames 50)。",
+    )
+    performance_group.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WRITE_WORKERS,
+        help=f"【可选】用于图片编码与写盘的线程数 (默认为: {DEFAULT_WRITE_WORKERS})。\n"
+        "解码始终在主线程进行，PNG/JPEG 压缩会分摊到这些线程上。",
+    )
+    performance_group.add_argument(
+        "--queue-size",
+        type=int,
+        default=None,
+        help="【可选】等待写盘的最大帧数 (默认为: 线程数 x 4)。\n"
+        "达到上限时解码会暂停，避免高分辨率视频占满内存。",
+    )
+    performance_group.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"【可选】批量模式下同时处理的视频数 (默认为: {DEFAULT_BATCH_CONCURRENCY})。\n"
+        "所有视频共用同一个进程池，避免为每个视频重复启动解释器与导入 OpenCV。",
+    )
+    performance_group.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="【可选】忽略输出目录中已有的续传清单，重新提取全部帧。\n"
+        f"默认情况下 images/npy 模式会在输出目录维护 '{MANIFEST_FILENAME}'，\n"
+        "计划未变时重新运行只会补齐缺失的帧。",
+    )
+    performance_group.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="【可选】并行解码的进程数 (默认为: 1)。\n"
+        "目标帧会被划分为连续的若干段，每个进程独立打开视频并定位到段首，\n"
+        "输出编号与单进程运行完全一致。每个进程各自拥有 --workers 个写盘线程。",
+    )
+
     args = parser.parse_args()
 
+    videos, batch_mode = resolve_input_videos(args.input_video)
+    if batch_mode and not videos:
+        print(f"🔴 错误: 未在 '{args.input_video}' 中找到任何视频文件。")
+        return
+    if batch_mode and args.output_mode == "rgb24":
+        print("🔴 错误: rgb24 模式只能处理单个视频。")
+        return
+
+    # 抢占式节点通常先发送 SIGTERM: 转换为正常退出，以便续传清单在退出前落盘
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    # rgb24 模式独占标准输出: 保留原始二进制流，其余打印信息全部改写到标准错误
+    output_stream = None
+    if args.output_mode == "rgb24":
+        output_stream = sys.stdout.buffer
+        sys.stdout = sys.stderr
+
+    imwrite_params = build_imwrite_params(
+        args.format,
+        png_compression=args.png_compression,
+        jpeg_quality=args.jpeg_quality,
+        jpeg_optimize=args.jpeg_optimize,
+        jpeg_progressive=args.jpeg_progressive,
+        webp_quality=args.webp_quality,
+        webp_lossless=args.webp_lossless,
+        fast=args.fast,
+    )
+
     # --- 配置信息打印 ---
     print("\n--- 🛠️ 配置信息 ---")
     print(f"➡️ 输入视频: {args.input_video}")
@@ -212,24 +1454,58 @@ def main():
         print(f"⚙️ 抽帧模式: 按帧率提取 ({args.fps} FPS)")
     if args.frames:
         print(f"⚙️ 抽帧模式: 按总数提取 ({args.frames} 帧)")
+    if args.select:
+        print(f"⚙️ 抽帧模式: 按内容挑选 ({args.select} 帧, 分析步长 {args.analysis_stride})")
+    print(f"🎛️ 解码后端: {args.backend.upper()}")
+    if args.scale is not None:
+        print(f"📏 缩放比例: {args.scale}")
+    print(f"📤 输出模式: {args.output_mode}")
     print(f"🏷️ 命名格式: {args.format}")
     print(f"🔢 起始序号: {args.start_number}")
+    print(f"🗜️ 编码参数: {imwrite_params if imwrite_params else 'OpenCV 默认值'}{' (--fast)' if args.fast else ''}")
+    print(f"⏩ 稀疏模式: {'启用' if args.sparse or args.select else '禁用'}")
+    print(f"🧵 写盘线程: {args.workers}")
+    if batch_mode:
+        print(f"📚 批量模式: {len(videos)} 个视频, 并发 {args.concurrency} 个")
+    else:
+        print(f"🧩 解码进程: {args.jobs}")
+    print(f"♻️ 断点续传: {'禁用' if args.no_resume else '启用'}")
     if args.padding is not None:
         print(f"0️⃣ 数字宽度: 手动指定为 {args.padding} 位")
     else:
         print(f"0️⃣ 数字宽度: 自动计算")
     print("----------------------\n")
 
-    extract_frames_professional(
-        args.input_video,
-        args.output_dir,
-        args.format,
+    options = dict(
+        output_format=args.format,
         fps_to_extract=args.fps,
         total_frames=args.frames,
         start_number=args.start_number,
         padding=args.padding,
+        sparse=args.sparse,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        imwrite_params=imwrite_params,
+        output_mode=args.output_mode,
+        resume=not args.no_resume,
+        select_count=args.select,
+        analysis_stride=args.analysis_stride,
+        backend=args.backend,
+        scale=args.scale,
     )
 
+    if batch_mode:
+        # 批量模式的并行度来自多个视频同时处理，单个视频内部不再分段
+        extract_batch(videos, args.output_dir, options, args.concurrency)
+    else:
+        extract_frames_professional(
+            args.input_video,
+            args.output_dir,
+            jobs=args.jobs,
+            output_stream=output_stream,
+            **options,
+        )
+
     print("🎉 所有任务已完成！")
 
 